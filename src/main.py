@@ -11,53 +11,55 @@ settings_file = os.path.join(current_dir, "configs/settings.json")
 
 ### /src/main.py
 from src.services.api_coingecko import CoinGeckoAPI
+from src.services.market_snapshot import TieredMarketRefresher, MarketHistoryStore
 from src.services.api_mexc import MexcAPI
-from src.services.utils import calculate_precision, format_dataframe, split_message, load_exclusion_lists, load_settings, is_excluded_coin, apply_symbol_corrections
+from src.services.order_pipeline import OrderPipeline
+from src.services.utils import format_dataframe, split_message, load_exclusion_lists, load_settings, is_excluded_coin, apply_symbol_corrections
 from src.services.database import DatabaseManager
+from src.services.trade_sync import TradeSync
+from src.services.pnl import FifoPnlEngine
 from src.strategies.rsi_analysis import RSIAnalyzer
 from src.telegram_bot.messenger import TelegramMessenger
 from src.sheets.google_sheet import GoogleSheetManager
 from src.configs.credentials import Credentials
 
-import pandas as pd
-
 
 def main():
     # Initialize API clients and other services
+    settings = load_settings(settings_file)
     coingecko = CoinGeckoAPI()
+    market_refresher = TieredMarketRefresher(
+        coingecko,
+        top_pages=settings.get("market_top_pages", 5),
+        tail_pages_per_run=settings.get("market_tail_pages_per_run", 2)
+    )
+    market_history = MarketHistoryStore()
     messenger = TelegramMessenger()
     mexc = MexcAPI(Credentials.MEXC_API_KEY, Credentials.MEXC_API_SECRET, messenger)
     db_trades = DatabaseManager("mexc_trades.db")
-    rsi_analyzer = RSIAnalyzer(exclusion_file)
+    rsi_analyzer = RSIAnalyzer(exclusion_file, streaming_indicators=settings.get("streaming_indicators", False))
     
     #Key da planilha no Google Sheets
     sheet_manager = GoogleSheetManager(Credentials.SPREADSHEET_KEY) 
 
     # Fetch and process data from CoinGecko
     print("Fetching market data from CoinGecko...")
-    all_coins_data = coingecko.fetch_all_coins(max_pages=5)
-    
-    # Filter relevant columns
-    filtered_data = [
-    {
-        "id": coin["id"],
-        "name": coin["name"],
-        "symbol": coin["symbol"],
-        "market_cap_rank": coin["market_cap_rank"],
-        "ath_change_percentage": coin["ath_change_percentage"],
-        "ath_date": coin["ath_date"],
-        "total_volume": coin["total_volume"]  # Novo campo adicionado
-    }
-    for coin in all_coins_data
-]
+    # Top pages every run, long-tail pages in rotation, merged into a persistent snapshot
+    df = market_refresher.refresh()
+    print(f"CoinGecko cache: {coingecko.cache_info()}")
+    market_history.append(market_refresher.fresh_rows(df), run_ts=market_refresher.run_ts)
 
-    # Convert to DataFrame and sort
-    df = pd.DataFrame(filtered_data)
+    # Sort
     df_sorted = df.sort_values(by="ath_change_percentage", ascending=False)
     
-    # Update Google Sheets
+    # Update Google Sheets (snapshot completo, incluindo as páginas da cauda)
     print("Updating Google Sheet...")
     sheet_manager.update_sheet(df_sorted)
+
+    # Filtros e ordens só com linhas atualizadas na última rotação completa da cauda
+    # (ou até market_max_staleness segundos, se configurado)
+    df = market_refresher.recent_rows(df, settings.get("market_max_staleness"))
+    df_sorted = df.sort_values(by="ath_change_percentage", ascending=False)
     
     # Filter and sort data
     filtered_df = df[df["market_cap_rank"] <= 500]
@@ -94,10 +96,14 @@ def main():
     top_10_df = filtered_df.head(10)
     top_5_df = top_10_df.sort_values(by="market_cap_rank").head(5)
     top_5_df = top_5_df[~top_5_df['symbol'].isin(exclusion_data["mexc_exclude"])].reset_index(drop=True)     
-    lowcap_df_close = ", ".join([symbol for symbol in exclusion_data["current_ath_lowcap"] if symbol not in lowcap_df['symbol'].tolist()])
+    # Só fecha moedas com dados recentes que saíram do filtro: moeda sem atualização não conta como saída
+    recent_symbols = set(apply_symbol_corrections(df.copy(), exclusion_data["symbol_corrections"])["symbol"])
+    lowcap_df_close = ", ".join([
+        symbol for symbol in exclusion_data["current_ath_lowcap"]
+        if symbol in recent_symbols and symbol not in lowcap_df['symbol'].tolist()
+    ])
     lowcap_df = lowcap_df[~lowcap_df['symbol'].isin(exclusion_data["current_ath_lowcap"])].reset_index(drop=True)
         
-    settings = load_settings(settings_file)
     usd_amount = settings["usd_amount"]
     
     print("Moedas para abrir na MEXC pelo setup TOP 500: ", top_5_df["symbol"].tolist())
@@ -109,64 +115,41 @@ def main():
     print("\nExecuting trading logic...")
     symbols = "; ".join(top_5_df["symbol"].tolist())
     messenger.send_message(f"Symbols: {symbols.upper()}")
+    candidates = []
     for _, row in top_5_df.iterrows():
         symbol = row["symbol"]
         if symbol in exclusion_data["current_ath"]:
             amount = usd_amount * 0.2
         else:
-            amount = usd_amount 
-            
-        symbol = row["symbol"].upper()
-        pair_info = mexc.check_pair_exists(symbol)
-        if pair_info and pair_info["exists"]:
-            print(f"\nPair {symbol}USDT found. Preparing to place order...")
-            open_price = mexc.get_open_price(symbol)
-            if open_price > 0:
-                quantity = calculate_precision(amount, open_price, pair_info["baseAssetPrecision"])
-                mexc.place_limit_order(symbol, open_price, quantity, "BUY")
-            else:
-                print(f"Open price for {symbol} could not be found.")
-        else:
-            print(f"\nPair {symbol}USDT not found on MEXC SPOT market.")
-         
-         
+            amount = usd_amount
+        candidates.append((symbol.upper(), amount, "top"))
+
     print("\nExecuting trading logic for low caps...")
     symbols = ", ".join(lowcap_df["symbol"].tolist())
-    messenger.send_message(f"Symbols Low Cap: {symbols.upper()}")   
+    messenger.send_message(f"Symbols Low Cap: {symbols.upper()}")
     for _, row in lowcap_df.iterrows():
-        symbol = row["symbol"].upper()
-        pair_info = mexc.check_pair_exists(symbol)
-        if pair_info and pair_info["exists"]:
-            print(f"\nPair {symbol}USDT found. Preparing to place order...")
-            open_price = mexc.get_open_price(symbol)
-            if open_price > 0:
-                quantity = calculate_precision(usd_amount/2, open_price, pair_info["baseAssetPrecision"])
-                mexc.place_limit_order(symbol, open_price, quantity, "BUY")
-            else:
-                print(f"Open price for {symbol} could not be found.")
-        else:
-            print(f"\nPair {symbol}USDT not found on MEXC SPOT market.")
+        candidates.append((row["symbol"].upper(), usd_amount / 2, "lowcap"))
+
+    # Prepara e envia todas as ordens em paralelo
+    order_pipeline = OrderPipeline(mexc, max_in_flight=settings.get("max_orders_in_flight", 5))
+    order_results = order_pipeline.execute(candidates, batch=settings.get("batch_orders", False))
+    for result in order_results:
+        print(f"{result['tag']} {result['symbol']}: {result['status']}")
             
     
     # Executar a análise de RSI após a lógica principal
     print("Running RSI analysis...")
-    rsi_data, symbol_data = rsi_analyzer.run_rsi_analysis()
+    # Tabela de features (uma linha por símbolo, já com RSI_Rank e RSI_Rank_ASC)
+    features = rsi_analyzer.run_rsi_analysis()
 
-    #Calculate RSI Rank and add it to symbol_data dict
-    all_data_df = pd.DataFrame(rsi_data)
-    all_data_df['RSI_Rank'] = all_data_df['RSI'].rank(ascending=False, method='dense')
-    all_data_df['RSI_Rank_ASC'] = all_data_df['RSI'].rank(ascending=True, method='dense')
-    for symbol in symbol_data.keys():
-        symbol_data[symbol]['RSI_Rank'] = all_data_df.loc[all_data_df['symbol'] == symbol, 'RSI_Rank'].values[0]
-        symbol_data[symbol]['RSI_Rank_ASC'] = all_data_df.loc[all_data_df['symbol'] == symbol, 'RSI_Rank_ASC'].values[0]
-        
-    print(f"RSI Analysis Completed. {len(rsi_data)} symbols analyzed.")
+    print(f"RSI Analysis Completed. {len(features)} symbols analyzed.")
     
     # Opcional: Enviar os resultados para o Telegram
-    messenger.send_message(f"RSI Analysis completed. {len(rsi_data)} symbols analyzed.")   
+    messenger.send_message(f"RSI Analysis completed. {len(features)} symbols analyzed.")   
 
-    #print(symbol_data)
-    listas = rsi_analyzer.processar_symbols(symbol_data)
+    #print(features)
+    # Setups avaliados sobre os valores float64 da análise, não sobre a tabela float32
+    listas = rsi_analyzer.processar_symbols()
     for lista_nome, lista_conteudo in listas.items():
         print(f"{lista_nome}: {lista_conteudo}")
     #rsi_analyzer.atualizar_config('/home/paulo/multitradeBot/config.py', listas)
@@ -175,9 +158,12 @@ def main():
     
     
     #Trades Histórico
-    #trades = mexc.fetch_trades()
-    #db_trades.save_to_sqlite(trades)
-    #db_trades.create_aggregated_view()
+    if settings.get("sync_trades", False):
+        trade_sync = TradeSync(mexc, db_trades)
+        trade_sync.sync([f"{symbol}USDT" for symbol, _, _ in candidates])
+    if settings.get("fifo_pnl", False):
+        processed = FifoPnlEngine(db_trades).process()
+        print(f"FIFO PnL updated with {processed} trades.")
 
 if __name__ == "__main__":
     main()
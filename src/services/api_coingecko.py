@@ -1,31 +1,209 @@
 import requests
 import pandas as pd
+import numpy as np
 import time
+import os
+import json
+import hashlib
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from src.services.rate_limit import TokenBucket
+
+# Colunas usadas pelo main() e pela planilha
+MARKET_COLUMNS = ["id", "name", "symbol", "market_cap_rank", "ath_change_percentage", "ath_date", "total_volume"]
+NUMERIC_COLUMNS = {"market_cap_rank", "ath_change_percentage", "total_volume"}
+# Colunas inteiras que podem vir nulas (o rank é exibido como inteiro no Telegram)
+INTEGER_COLUMNS = {"market_cap_rank"}
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "../data/coingecko_cache")
 
 class CoinGeckoAPI:
     BASE_URL = "https://api.coingecko.com/api/v3/coins/markets"
 
-    def __init__(self, currency="usd", order="market_cap_desc", per_page=250):
+    def __init__(self, currency="usd", order="market_cap_desc", per_page=250, calls_per_minute=30, max_workers=4,
+                 cache_dir=CACHE_DIR, cache_ttl=600):
         self.params = {
             "vs_currency": currency,
             "order": order,
             "per_page": per_page,
             "sparkline": "false"
         }
+        self.max_workers = max_workers
+        self.session = requests.Session()
+        # Limite de chamadas por minuto do plano da CoinGecko, compartilhado entre as threads
+        self.rate_limiter = TokenBucket(calls_per_minute, per=60, capacity=max_workers)
+        # Cache em disco das respostas (cache_dir=None desativa)
+        self.cache_dir = cache_dir
+        self.cache_ttl = cache_ttl
+        self.cache_stats = {"hits": 0, "revalidated": 0, "misses": 0}
+        self.cache_lock = threading.Lock()
 
-    def fetch_all_coins(self, max_pages=5):
-        all_coins_data = []
-        for page in range(1, max_pages + 1):
-            self.params["page"] = page
+    def _cache_path(self, params):
+        key = hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_cached(self, params):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._cache_path(params), "r") as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _store_cached(self, params, entry):
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._cache_path(params)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(entry, file)
+        os.replace(tmp_path, path)
+
+    def _count(self, stat):
+        with self.cache_lock:
+            self.cache_stats[stat] += 1
+
+    def cache_info(self):
+        """Return a copy of the cache hit/revalidation/miss counters."""
+        with self.cache_lock:
+            return dict(self.cache_stats)
+
+    def _retry_after(self, response, default=60):
+        """Read the Retry-After header (seconds or HTTP date) of a 429 response."""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return default
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            pass
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+        except (TypeError, ValueError):
+            return default
+
+    def fetch_page(self, page, max_retries=3):
+        """
+        Fetch a single page of /coins/markets. Returns None on error.
+        Fresh cache entries are served without any network call; stale ones
+        are revalidated with If-None-Match / If-Modified-Since.
+        """
+        params = dict(self.params, page=page)
+        cached = self._load_cached(params)
+        if cached and time.time() - cached["fetched_at"] < self.cache_ttl:
+            self._count("hits")
+            return cached["data"]
+
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        for attempt in range(max_retries + 1):
+            self.rate_limiter.acquire()
             print(f"Fetching page {page}...")
-            response = requests.get(self.BASE_URL, params=self.params)
+            try:
+                response = self.session.get(self.BASE_URL, params=params, headers=headers, timeout=30)
+            except requests.exceptions.RequestException as e:
+                print(f"Error accessing page {page}: {e}")
+                return None
+
+            if response.status_code == 304 and cached:
+                self._count("revalidated")
+                cached["fetched_at"] = time.time()
+                self._store_cached(params, cached)
+                return cached["data"]
             if response.status_code == 200:
+                self._count("misses")
                 page_data = response.json()
-                if not page_data:
-                    break
-                all_coins_data.extend(page_data)
-                time.sleep(2)  # Respect API rate limits
+                self._store_cached(params, {
+                    "fetched_at": time.time(),
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "data": page_data
+                })
+                return page_data
+            if response.status_code == 429 and attempt < max_retries:
+                wait = self._retry_after(response)
+                print(f"Rate limit reached on page {page}. Retrying in {wait:.0f}s...")
+                self.rate_limiter.pause(wait)
+                continue
+
+            print(f"Error accessing page {page}: {response.status_code}")
+            return None
+        return None
+
+    def _iter_raw_pages(self, pages):
+        """
+        Fetch pages concurrently and yield (page, data) in the given order.
+        Stops at the first empty or failed page, like the sequential version did.
+        """
+        pages = list(pages)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.fetch_page, page) for page in pages]
+            try:
+                for page, future in zip(pages, futures):
+                    page_data = future.result()
+                    if not page_data:
+                        break
+                    yield page, page_data
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def fetch_all_coins(self, max_pages=5):
+        all_coins_data = []
+        for _, page_data in self._iter_raw_pages(range(1, max_pages + 1)):
+            all_coins_data.extend(page_data)
+        return all_coins_data
+
+    def iter_market_pages(self, max_pages=5, pages=None):
+        """
+        Yield each page as soon as it arrives, trimmed to MARKET_COLUMNS.
+        `pages` selects specific page numbers instead of 1..max_pages.
+        """
+        if pages is None:
+            pages = range(1, max_pages + 1)
+        for _, page_data in self._iter_raw_pages(pages):
+            yield [{column: coin.get(column) for column in MARKET_COLUMNS} for coin in page_data]
+
+class MarketDataBuilder:
+    """
+    Append pages from CoinGeckoAPI.iter_market_pages into typed column arrays,
+    so the market data is held only once before building the DataFrame.
+    """
+
+    def __init__(self):
+        self.columns = {
+            column: array("d") if column in NUMERIC_COLUMNS else []
+            for column in MARKET_COLUMNS
+        }
+
+    def __len__(self):
+        return len(self.columns["id"])
+
+    def append(self, page):
+        for column, values in self.columns.items():
+            if column in NUMERIC_COLUMNS:
+                values.extend(np.nan if coin[column] is None else coin[column] for coin in page)
             else:
-                print(f"Error accessing page {page}: {response.status_code}")
-                break
-        return all_coins_data
\ No newline at end of file
+                values.extend(coin[column] for coin in page)
+
+    def to_dataframe(self):
+        df = pd.DataFrame({
+            column: np.frombuffer(values, dtype=np.float64) if column in NUMERIC_COLUMNS else values
+            for column, values in self.columns.items()
+        }, columns=MARKET_COLUMNS)
+        return cast_integer_columns(df)
+
+def cast_integer_columns(df):
+    """Convert INTEGER_COLUMNS (float with NaN) to the nullable Int64 dtype."""
+    for column in INTEGER_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype("Int64")
+    return df
@@ -2,14 +2,45 @@ import requests
 import hmac
 import hashlib
 import time
+import os
+import json
+import threading
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+EXCHANGE_INFO_CACHE = os.path.join(os.path.dirname(__file__), "../data/mexc_exchange_info.json")
 
 class MexcAPI:
     BASE_URL = "https://api.mexc.com/api/v3"
+    BATCH_ORDER_LIMIT = 20  # Máximo de ordens por chamada de /batchOrders
+    RECV_WINDOW = 5000
+    TIME_SYNC_INTERVAL = 300  # Segundos entre sincronizações do relógio com o servidor
+    TIMESTAMP_ERROR_CODES = {700003}  # Timestamp fora do recvWindow
+    ORDER_NOT_FOUND_CODES = {-2013}  # Ordem inexistente (consulta por origClientOrderId)
+    TRADES_PAGE_LIMIT = 1000  # Máximo de trades por chamada de /myTrades
+    TRADES_EPOCH = 1514764800000  # 2018-01-01 UTC: início da paginação sem cursor
 
-    def __init__(self, api_key, api_secret, messenger=None):
+    def __init__(self, api_key, api_secret, messenger=None, exchange_info_ttl=3600, exchange_info_cache=EXCHANGE_INFO_CACHE):
         self.api_key = api_key
         self.api_secret = api_secret
         self.messenger = messenger
+        # exchangeInfo indexado por símbolo, recarregado a cada exchange_info_ttl segundos
+        self.exchange_info_ttl = exchange_info_ttl
+        self.exchange_info_cache = exchange_info_cache
+        self.exchange_info = None
+        self.exchange_info_fetched_at = 0
+        self.exchange_info_lock = threading.Lock()
+        # Sessão com pool de conexões (keep-alive) usada em todas as chamadas
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"X-MEXC-APIKEY": self.api_key})
+        # Diferença entre o relógio do servidor e o local, em ms
+        self.time_offset = 0
+        self.time_sync_thread = None
+        self.time_sync_stop = threading.Event()
+        self.time_sync_lock = threading.Lock()
 
     def create_signature(self, query_string):
         return hmac.new(
@@ -18,21 +49,147 @@ class MexcAPI:
             hashlib.sha256
         ).hexdigest()
 
+    def sync_server_time(self):
+        """Update the cached offset between MEXC server time and the local clock."""
+        try:
+            before = time.time() * 1000
+            response = self.session.get(f"{self.BASE_URL}/time", timeout=10)
+            after = time.time() * 1000
+            response.raise_for_status()
+            server_time = response.json()["serverTime"]
+            self.time_offset = int(server_time - (before + after) / 2)
+        except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+            print(f"Error syncing MEXC server time: {e}")
+        return self.time_offset
+
+    def _time_sync_loop(self):
+        while not self.time_sync_stop.wait(self.TIME_SYNC_INTERVAL):
+            self.sync_server_time()
+
+    def start_time_sync(self):
+        """
+        Sync the clock now and keep refreshing the offset in a background thread.
+        Safe to call from concurrent requests: only the first call syncs and starts the thread.
+        """
+        with self.time_sync_lock:
+            if self.time_sync_thread and self.time_sync_thread.is_alive():
+                return
+            self.sync_server_time()
+            self.time_sync_stop.clear()
+            self.time_sync_thread = threading.Thread(target=self._time_sync_loop, daemon=True)
+            self.time_sync_thread.start()
+
+    def stop_time_sync(self):
+        self.time_sync_stop.set()
+
+    def timestamp(self):
+        return int(time.time() * 1000) + self.time_offset
+
+    def signed_request(self, method, path, params=None):
+        """
+        Send a signed request: adds recvWindow and a server-synced timestamp,
+        signs the query string and sends it through the pooled session.
+        Retries once after a resync if the exchange rejects the timestamp.
+        """
+        self.start_time_sync()
+        url = f"{self.BASE_URL}{path}"
+        for attempt in range(2):
+            query = dict(params or {})
+            query["recvWindow"] = self.RECV_WINDOW
+            query["timestamp"] = self.timestamp()
+            query_string = urlencode(query)
+            query_string += f"&signature={self.create_signature(query_string)}"
+
+            if method == "GET":
+                response = self.session.get(f"{url}?{query_string}", timeout=30)
+            else:
+                response = self.session.request(
+                    method, url, data=query_string, timeout=30,
+                    headers={"Content-Type": "application/x-www-form-urlencoded"}
+                )
+
+            if attempt == 0 and response.status_code != 200:
+                try:
+                    code = response.json().get("code")
+                except (ValueError, AttributeError):
+                    code = None
+                if code in self.TIMESTAMP_ERROR_CODES:
+                    self.sync_server_time()
+                    continue
+            return response
+        return response
+
+    def _index_exchange_info(self, market_data):
+        return {
+            market["symbol"]: {
+                "baseAssetPrecision": market["baseAssetPrecision"],
+                "quoteAssetPrecision": market["quoteAssetPrecision"],
+                "filters": market.get("filters", [])
+            }
+            for market in market_data["symbols"]
+        }
+
+    def _load_exchange_info_file(self):
+        if not self.exchange_info_cache:
+            return None
+        try:
+            with open(self.exchange_info_cache, "r") as file:
+                cached = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+        if time.time() - cached["fetched_at"] >= self.exchange_info_ttl:
+            return None
+        return cached
+
+    def _save_exchange_info_file(self):
+        if not self.exchange_info_cache:
+            return
+        os.makedirs(os.path.dirname(self.exchange_info_cache), exist_ok=True)
+        tmp_path = f"{self.exchange_info_cache}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"fetched_at": self.exchange_info_fetched_at, "symbols": self.exchange_info}, file)
+        os.replace(tmp_path, self.exchange_info_cache)
+
+    def get_exchange_info(self, force=False):
+        """
+        Return exchangeInfo as a dict keyed by symbol (precision and filters).
+        Downloaded at most once per exchange_info_ttl; a copy is kept on disk for cold starts.
+        Returns None if the download fails and there is no usable copy.
+        """
+        with self.exchange_info_lock:
+            if not force and self.exchange_info is not None and time.time() - self.exchange_info_fetched_at < self.exchange_info_ttl:
+                return self.exchange_info
+
+            cached = None if force else self._load_exchange_info_file()
+            if cached:
+                self.exchange_info = cached["symbols"]
+                self.exchange_info_fetched_at = cached["fetched_at"]
+                return self.exchange_info
+
+            url = f"{self.BASE_URL}/exchangeInfo"
+            response = self.session.get(url)
+            if response.status_code != 200:
+                print(f"Error accessing MEXC API: {response.status_code}")
+                return self.exchange_info
+
+            self.exchange_info = self._index_exchange_info(response.json())
+            self.exchange_info_fetched_at = time.time()
+            self._save_exchange_info_file()
+            return self.exchange_info
+
     def check_pair_exists(self, symbol):
-        url = f"{self.BASE_URL}/exchangeInfo"
-        response = requests.get(url)
-        if response.status_code != 200:
-            print(f"Error accessing MEXC API: {response.status_code}")
+        exchange_info = self.get_exchange_info()
+        if exchange_info is None:
             return False
 
-        market_data = response.json()
-        for market in market_data["symbols"]:
-            if market["symbol"] == f"{symbol}USDT":
-                return {
-                    "exists": True,
-                    "baseAssetPrecision": market["baseAssetPrecision"],
-                    "quoteAssetPrecision": market["quoteAssetPrecision"]
-                }
+        market = exchange_info.get(f"{symbol}USDT")
+        if market:
+            return {
+                "exists": True,
+                "baseAssetPrecision": market["baseAssetPrecision"],
+                "quoteAssetPrecision": market["quoteAssetPrecision"],
+                "filters": market["filters"]
+            }
         return {"exists": False}
 
     def get_open_price(self, symbol):
@@ -43,7 +200,7 @@ class MexcAPI:
             "limit": 1  # Apenas o último candle
         }
         
-        response = requests.get(url, params=params)
+        response = self.session.get(url, params=params)
         if response.status_code == 200:
             kline_data = response.json()
             return float(kline_data[0][1])  # O preço de abertura está na posição 1
@@ -51,26 +208,50 @@ class MexcAPI:
             print(f"Erro ao recuperar preço de abertura para {symbol}: {response.status_code}")
             return None
 
-    def place_limit_order(self, symbol, price, quantity, side):
-        symbol = symbol + 'USDT'
-        side = side
-        order_type = "LIMIT"
-        recv_window = 5000
-        timestamp = int(time.time() * 1000)
+    def get_prices(self, symbols, price_type="open", max_workers=8):
+        """
+        Return {symbol: price} for a list of base symbols.
+        price_type "open" is the open of the current UTC daily candle (same as
+        get_open_price), fetched concurrently for the pairs listed on MEXC.
+        "last" (lastPrice) and "open_24h" (openPrice, the price 24h ago) come from a
+        single call to the all-symbols 24h ticker.
+        """
+        if price_type == "open":
+            exchange_info = self.get_exchange_info() or {}
+            listed = [symbol for symbol in dict.fromkeys(symbols) if f"{symbol}USDT" in exchange_info]
+            if not listed:
+                return {}
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(listed))) as executor:
+                return dict(zip(listed, executor.map(self.get_open_price, listed)))
 
-        query_string = (
-            f"symbol={symbol}&side={side}&type={order_type}"
-            f"&quantity={quantity}&price={price}&recvWindow={recv_window}"
-            f"&timestamp={timestamp}"
-        )
+        field = "openPrice" if price_type == "open_24h" else "lastPrice"
+        wanted = {f"{symbol}USDT": symbol for symbol in symbols}
+        prices = {}
 
-        signature = self.create_signature(query_string)
-        query_string += f"&signature={signature}"
+        url = f"{self.BASE_URL}/ticker/24hr"
+        response = self.session.get(url)
+        if response.status_code == 200:
+            for ticker in response.json():
+                symbol = wanted.get(ticker["symbol"])
+                if symbol is not None and ticker.get(field) is not None:
+                    prices[symbol] = float(ticker[field])
+        else:
+            print(f"Erro ao recuperar tickers da MEXC: {response.status_code}")
+        return prices
 
-        url = f"{self.BASE_URL}/order"
-        headers = {"X-MEXC-APIKEY": self.api_key}
+    def place_limit_order(self, symbol, price, quantity, side, client_order_id=None):
+        symbol = symbol + 'USDT'
+        params = {
+            "symbol": symbol,
+            "side": side,
+            "type": "LIMIT",
+            "quantity": quantity,
+            "price": price
+        }
+        if client_order_id:
+            params["newClientOrderId"] = client_order_id
 
-        response = requests.post(url, headers=headers, data=query_string)
+        response = self.signed_request("POST", "/order", params)
         if response.status_code == 200:
             msg = f"Order placed successfully for {symbol} at price {price}!"
             print(msg)
@@ -86,29 +267,156 @@ class MexcAPI:
                 self.messenger.send_message(error_msg)
             return response.json()
 
-    def fetch_trades(self):
+    def get_order(self, symbol, client_order_id):
+        """
+        Query an order by its newClientOrderId. Returns the order, or None if the
+        exchange does not know it. Any other error raises, so a caller never takes
+        an unknown state for "not placed".
+        """
+        response = self.signed_request("GET", "/order", {
+            "symbol": f"{symbol}USDT",
+            "origClientOrderId": client_order_id
+        })
+        if response.status_code == 200:
+            return response.json()
+        try:
+            code = response.json().get("code")
+        except (ValueError, AttributeError):
+            code = None
+        if code in self.ORDER_NOT_FOUND_CODES:
+            return None
+        response.raise_for_status()
+        raise requests.exceptions.HTTPError(f"Unexpected response {response.status_code}: {response.text}", response=response)
+
+    def place_limit_orders(self, orders):
+        """
+        Place several limit orders of ONE symbol through /batchOrders (MEXC only accepts
+        a single symbol per batch), in chunks of up to BATCH_ORDER_LIMIT.
+        `orders` is a list of dicts with symbol, price, quantity, side and optionally
+        client_order_id. Items rejected by the batch are retried once with place_limit_order.
+        Returns one response per order, in the same order as `orders`; the entry is None
+        when a transport error left the order state unknown (check it with get_order
+        before sending it again).
+        """
+        symbols = {order["symbol"] for order in orders}
+        if len(symbols) > 1:
+            raise ValueError(f"place_limit_orders accepts a single symbol per call, got {sorted(symbols)}.")
+
+        results = [None] * len(orders)
+        for start in range(0, len(orders), self.BATCH_ORDER_LIMIT):
+            chunk = list(range(start, min(start + self.BATCH_ORDER_LIMIT, len(orders))))
+            symbol = orders[start]["symbol"]
+            batch = []
+            for index in chunk:
+                order = orders[index]
+                item = {
+                    "symbol": f"{order['symbol']}USDT",
+                    "side": order["side"],
+                    "type": "LIMIT",
+                    "quantity": str(order["quantity"]),
+                    "price": str(order["price"])
+                }
+                if order.get("client_order_id"):
+                    item["newClientOrderId"] = order["client_order_id"]
+                batch.append(item)
+
+            try:
+                response = self.signed_request("POST", "/batchOrders", {
+                    "batchOrders": json.dumps(batch, separators=(",", ":"))
+                })
+            except requests.exceptions.RequestException as e:
+                print(f"Batch order failed for {symbol}USDT: {e}")
+                continue
+            responses = response.json() if response.status_code == 200 else []
+            if not isinstance(responses, list):
+                responses = []
+            if response.status_code != 200:
+                print(f"Batch order failed for {symbol}USDT. Error {response.status_code}: {response.text}")
+
+            placed = 0
+            for position, index in enumerate(chunk):
+                item_response = responses[position] if position < len(responses) else None
+                if item_response and "orderId" in item_response:
+                    results[index] = item_response
+                    placed += 1
+                    continue
+                # Item rejeitado na batch: tenta como ordem individual
+                order = orders[index]
+                try:
+                    results[index] = self.place_limit_order(
+                        order["symbol"], order["price"], order["quantity"], order["side"],
+                        client_order_id=order.get("client_order_id")
+                    )
+                except requests.exceptions.RequestException as e:
+                    print(f"Error placing order for {symbol}USDT: {e}")
+
+            msg = f"Batch order for {symbol}USDT: {placed}/{len(chunk)} orders placed in batch."
+            print(msg)
+            if self.messenger:
+                self.messenger.send_message(msg)
+        return results
+
+    def _parse_trade(self, trade):
+        return {
+            'trade_id': str(trade['id']),
+            'symbol': trade['symbol'],
+            'side': 'BUY' if trade['isBuyer'] else 'SELL',
+            'quantity': float(trade['qty']),
+            'price': float(trade['price']),
+            'quoteQty': float(trade['quoteQty']),
+            'time': trade['time']
+        }
+
+    def fetch_trades_page(self, symbol, start_time=None, limit=TRADES_PAGE_LIMIT):
+        """Fetch one page of /myTrades for `symbol` (e.g. 'BTCUSDT') from start_time (ms)."""
+        params = {"symbol": symbol, "limit": limit}
+        if start_time is not None:
+            params["startTime"] = start_time
+        response = self.signed_request("GET", "/myTrades", params)
+        response.raise_for_status()
+        trades = [self._parse_trade(trade) for trade in response.json()]
+        return sorted(trades, key=lambda trade: (trade['time'], trade['trade_id']))
+
+    def fetch_trades_since(self, symbol, start_time=None, limit=TRADES_PAGE_LIMIT):
+        """
+        Page forward through /myTrades from start_time until the end of the history.
+        Without a cursor the paging starts at TRADES_EPOCH: without startTime the API
+        returns only the most recent trades and the older history would never be fetched.
+        The page boundary trade is fetched again and deduplicated by trade id.
+        """
+        if start_time is None:
+            start_time = self.TRADES_EPOCH
+        trades = {}
+        while True:
+            page = self.fetch_trades_page(symbol, start_time, limit)
+            new_trades = [trade for trade in page if trade['trade_id'] not in trades]
+            for trade in new_trades:
+                trades[trade['trade_id']] = trade
+            if len(page) < limit:
+                break
+            if new_trades:
+                start_time = page[-1]['time']
+            else:
+                # Página cheia sem trades novas: mais de `limit` trades no mesmo ms; segue para o próximo ms
+                print(f"{symbol}: more than {limit} trades at {page[-1]['time']} ms, skipping to the next ms")
+                start_time = page[-1]['time'] + 1
+        return sorted(trades.values(), key=lambda trade: (trade['time'], trade['trade_id']))
+
+    def fetch_trades(self, symbol=None):
         print("Loading trades history on exchange...")
-        url = f"{self.BASE_URL}/myTrades"
-        headers = {"X-MEXC-APIKEY": self.api_key}
         trades = []
         try:
-            response = requests.get(url, headers=headers)
+            params = {"symbol": symbol} if symbol else None
+            response = self.signed_request("GET", "/myTrades", params)
             response.raise_for_status()
             raw_trades = response.json()
 
             # Transformando os dados conforme a estrutura do banco
             for trade in raw_trades:
-                trades.append({
-                    'symbol': trade['symbol'],
-                    'side': 'BUY' if trade['isBuyer'] else 'SELL',
-                    'quantity': float(trade['qty']),
-                    'price': float(trade['price']),
-                    'quoteQty': float(trade['quoteQty']),
-                    'time': trade['time']
-                })
+                trades.append(self._parse_trade(trade))
             print(trades)
                 
             self.messenger.send_message(f"Trades database updated successfully")
         except requests.exceptions.RequestException as e:
             self.messenger.send_message(f"Trades database update raises error: {e}")
-        return trades
\ No newline at end of file
+        return trades
@@ -3,14 +3,29 @@ import sqlite3
 class DatabaseManager:
     def __init__(self, db_name):
         self.db_name = db_name
+        self.conn = None
 
-    def save_to_sqlite(self, trades):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+    def connect(self):
+        """Return the long-lived connection, opening it (WAL mode) and creating the schema on first use."""
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.db_name)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            with self.conn:
+                self.create_tables(self.conn)
+        return self.conn
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
 
+    def create_tables(self, conn):
+        cursor = conn.cursor()
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS trades (
                 id INTEGER PRIMARY KEY,
+                trade_id TEXT,
                 symbol TEXT,
                 side TEXT,
                 quantity REAL,
@@ -19,30 +34,156 @@ class DatabaseManager:
                 time INTEGER
             )
         ''')
+        # Bancos antigos não têm a coluna trade_id
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(trades)")]
+        if 'trade_id' not in columns:
+            cursor.execute("ALTER TABLE trades ADD COLUMN trade_id TEXT")
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_trades_trade_id ON trades (trade_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trades_symbol_time ON trades (symbol, time)")
+        self.create_summary_table(cursor)
+        self._create_aggregated_view(cursor)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS trade_sync_cursor (
+                symbol TEXT PRIMARY KEY,
+                last_time INTEGER,
+                last_trade_id TEXT
+            )
+        ''')
 
-        for trade in trades:
+    def create_summary_table(self, cursor):
+        """
+        Per-symbol running totals kept up to date by triggers on trades,
+        so reading the summary costs O(symbols) instead of a scan of all trades.
+        """
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'symbol_summary'"
+        ).fetchone()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS symbol_summary (
+                symbol TEXT PRIMARY KEY,
+                total_result REAL NOT NULL DEFAULT 0,
+                total_buys INTEGER NOT NULL DEFAULT 0,
+                trade_count INTEGER NOT NULL DEFAULT 0,
+                quantity_sum REAL NOT NULL DEFAULT 0,
+                price_sum REAL NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_trades_summary_insert AFTER INSERT ON trades
+            BEGIN
+                INSERT INTO symbol_summary (symbol, total_result, total_buys, trade_count, quantity_sum, price_sum)
+                VALUES (
+                    NEW.symbol,
+                    CASE WHEN NEW.side = 'BUY' THEN NEW.price * NEW.quantity ELSE -NEW.price * NEW.quantity END,
+                    CASE WHEN NEW.side = 'BUY' THEN 1 ELSE 0 END,
+                    1,
+                    NEW.quantity,
+                    NEW.price
+                )
+                ON CONFLICT(symbol) DO UPDATE SET
+                    total_result = total_result + excluded.total_result,
+                    total_buys = total_buys + excluded.total_buys,
+                    trade_count = trade_count + 1,
+                    quantity_sum = quantity_sum + excluded.quantity_sum,
+                    price_sum = price_sum + excluded.price_sum;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_trades_summary_delete AFTER DELETE ON trades
+            BEGIN
+                UPDATE symbol_summary SET
+                    total_result = total_result - CASE WHEN OLD.side = 'BUY' THEN OLD.price * OLD.quantity ELSE -OLD.price * OLD.quantity END,
+                    total_buys = total_buys - CASE WHEN OLD.side = 'BUY' THEN 1 ELSE 0 END,
+                    trade_count = trade_count - 1,
+                    quantity_sum = quantity_sum - OLD.quantity,
+                    price_sum = price_sum - OLD.price
+                WHERE symbol = OLD.symbol;
+                DELETE FROM symbol_summary WHERE symbol = OLD.symbol AND trade_count <= 0;
+            END
+        ''')
+        if not exists:
+            # Primeira criação: carrega os totais das trades já existentes
             cursor.execute('''
-                INSERT INTO trades (symbol, side, quantity, price, quoteQty, time)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (trade['symbol'], trade['side'], trade['qty'], trade['price'], trade['quoteQty'], trade['time']))
+                INSERT INTO symbol_summary (symbol, total_result, total_buys, trade_count, quantity_sum, price_sum)
+                SELECT
+                    symbol,
+                    SUM(CASE WHEN side = 'BUY' THEN price * quantity ELSE -price * quantity END),
+                    COUNT(CASE WHEN side = 'BUY' THEN 1 ELSE NULL END),
+                    COUNT(*),
+                    SUM(quantity),
+                    SUM(price)
+                FROM trades
+                GROUP BY symbol
+            ''')
 
-        conn.commit()
-        conn.close()
+    def _insert_trades(self, conn, trades):
+        """Bulk insert; trades already stored (same trade_id) are skipped. Returns rows written."""
+        cursor = conn.executemany('''
+            INSERT OR IGNORE INTO trades (trade_id, symbol, side, quantity, price, quoteQty, time)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (trade['trade_id'], trade['symbol'], trade['side'], trade['quantity'], trade['price'], trade['quoteQty'], trade['time'])
+            for trade in trades
+        ])
+        return cursor.rowcount
 
-    def create_aggregated_view(self):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+    def save_to_sqlite(self, trades):
+        """Ingest a list of trades (as returned by MexcAPI) in a single transaction."""
+        conn = self.connect()
+        with conn:
+            return self._insert_trades(conn, trades)
+
+    def get_sync_cursors(self):
+        """Return {symbol: (last_time, last_trade_id)} for every synced symbol."""
+        rows = self.connect().execute("SELECT symbol, last_time, last_trade_id FROM trade_sync_cursor").fetchall()
+        return {symbol: (last_time, last_trade_id) for symbol, last_time, last_trade_id in rows}
+
+    def save_trades_and_cursor(self, symbol, trades):
+        """Insert the trades of a symbol and move its cursor to the last one, in one transaction."""
+        if not trades:
+            return 0
+        conn = self.connect()
+        last_trade = max(trades, key=lambda trade: (trade['time'], trade['trade_id']))
+        with conn:
+            written = self._insert_trades(conn, trades)
+            conn.execute('''
+                INSERT INTO trade_sync_cursor (symbol, last_time, last_trade_id)
+                VALUES (?, ?, ?)
+                ON CONFLICT(symbol) DO UPDATE SET
+                    last_time = excluded.last_time,
+                    last_trade_id = excluded.last_trade_id
+            ''', (symbol, last_trade['time'], last_trade['trade_id']))
+        return written
+
+    def _create_aggregated_view(self, cursor):
+        """
+        aggregated_results reads the per-symbol summary table, not the whole trades table.
+        Created with the schema; old databases have the view over trades, replaced once here.
+        """
+        row = cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'view' AND name = 'aggregated_results'"
+        ).fetchone()
+        if row and "symbol_summary" in row[0]:
+            return
+        cursor.execute("DROP VIEW IF EXISTS aggregated_results")
         cursor.execute('''
-            CREATE VIEW IF NOT EXISTS aggregated_results AS
-            SELECT 
+            CREATE VIEW aggregated_results AS
+            SELECT
                 symbol,
-                SUM(CASE WHEN side = 'BUY' THEN price * quantity ELSE -price * quantity END) AS total_result,
-                COUNT(CASE WHEN side = 'BUY' THEN 1 ELSE NULL END) AS total_buys,
-                SUM(quantity) / COUNT(*) AS avg_quantity,
-                AVG(price) AS avg_price
-            FROM trades
-            GROUP BY symbol
+                total_result,
+                total_buys,
+                quantity_sum / trade_count AS avg_quantity,
+                price_sum / trade_count AS avg_price
+            FROM symbol_summary
             ORDER BY total_result DESC
         ''')
-        conn.commit()
-        conn.close()
+
+    def create_aggregated_view(self):
+        """The view is created with the schema in connect(); kept for older callers."""
+        self.connect()
+
+    def get_summary(self, symbol=None):
+        """Return the aggregated_results rows, optionally for a single symbol (read only)."""
+        if symbol:
+            return self.connect().execute("SELECT * FROM aggregated_results WHERE symbol = ?", (symbol,)).fetchall()
+        return self.connect().execute("SELECT * FROM aggregated_results").fetchall()
@@ -0,0 +1,258 @@
+import sqlite3
+import time
+import os
+import pandas as pd
+from src.services.api_coingecko import MARKET_COLUMNS, MarketDataBuilder, cast_integer_columns
+
+SNAPSHOT_DB = os.path.join(os.path.dirname(__file__), "../data/market_snapshot.db")
+HISTORY_DB = os.path.join(os.path.dirname(__file__), "../data/market_history.db")
+HISTORY_COLUMNS = ["market_cap_rank", "ath_change_percentage", "ath_date", "total_volume"]
+
+class TieredMarketRefresher:
+    """
+    Keep a persistent snapshot of the CoinGecko market universe.
+    The top pages are fetched on every run and the long-tail pages are refreshed
+    a few at a time in rotation, so the whole universe (up to max_pages) is covered
+    with a fixed number of API calls per run. The default top_pages keeps the 5 pages
+    the scan always fetched; tail rows can be stale and are filtered with recent_rows(),
+    which by default keeps every row refreshed within the last full rotation.
+    """
+
+    def __init__(self, coingecko, db_path=SNAPSHOT_DB, top_pages=5, tail_pages_per_run=2, max_pages=40):
+        self.coingecko = coingecko
+        self.db_path = db_path
+        self.top_pages = top_pages
+        self.tail_pages_per_run = tail_pages_per_run
+        self.max_pages = max_pages
+        self.run_ts = None
+        self.rotation_start = None  # run_ts da execução mais antiga da rotação atual
+        self.create_tables()
+
+    def create_tables(self):
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS market_snapshot (
+                id TEXT PRIMARY KEY,
+                name TEXT,
+                symbol TEXT,
+                market_cap_rank REAL,
+                ath_change_percentage REAL,
+                ath_date TEXT,
+                total_volume REAL,
+                updated_at REAL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS refresh_state (
+                key TEXT PRIMARY KEY,
+                value INTEGER
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS refresh_runs (
+                run_ts REAL PRIMARY KEY
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def _get_tail_cursor(self, conn):
+        row = conn.execute("SELECT value FROM refresh_state WHERE key = 'tail_cursor'").fetchone()
+        if row and self.top_pages < row[0] <= self.max_pages:
+            return row[0]
+        return self.top_pages + 1
+
+    def rotation_runs(self):
+        """Number of runs needed to refresh every tail page once."""
+        tail_size = self.max_pages - self.top_pages
+        if tail_size <= 0 or self.tail_pages_per_run <= 0:
+            return 1
+        return -(-tail_size // self.tail_pages_per_run)
+
+    def _rotation_start(self, conn):
+        """
+        run_ts of the oldest run in the last full rotation (0 while the first rotation is running).
+        One extra run is kept because the rotation restarts early when the tail ends before
+        max_pages, and the pages after the restart are fetched one run later.
+        """
+        row = conn.execute(
+            "SELECT run_ts FROM refresh_runs ORDER BY run_ts DESC LIMIT 1 OFFSET ?",
+            (self.rotation_runs(),)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _next_pages(self, conn):
+        """Top pages plus the next tail_pages_per_run pages of the rotation."""
+        pages = list(range(1, self.top_pages + 1))
+        cursor = self._get_tail_cursor(conn)
+        tail_size = self.max_pages - self.top_pages
+        for offset in range(min(self.tail_pages_per_run, tail_size)):
+            pages.append(self.top_pages + 1 + (cursor - self.top_pages - 1 + offset) % tail_size)
+        return pages
+
+    def refresh(self):
+        """Fetch this run's pages, merge them into the snapshot and return the whole snapshot."""
+        conn = sqlite3.connect(self.db_path)
+        pages = self._next_pages(conn)
+        tail_pages = pages[self.top_pages:]
+        print(f"Refreshing CoinGecko pages {pages}...")
+
+        market_data = MarketDataBuilder()
+        fetched_pages = 0
+        for page in self.coingecko.iter_market_pages(pages=pages):
+            market_data.append(page)
+            fetched_pages += 1
+
+        df = market_data.to_dataframe()
+        self.run_ts = time.time()
+        df["updated_at"] = self.run_ts
+        df = df.astype(object).where(df.notna(), None)
+        conn.executemany(f'''
+            INSERT OR REPLACE INTO market_snapshot ({", ".join(MARKET_COLUMNS)}, updated_at)
+            VALUES ({", ".join("?" * (len(MARKET_COLUMNS) + 1))})
+        ''', df[MARKET_COLUMNS + ["updated_at"]].itertuples(index=False, name=None))
+
+        # Avança a rotação; se a cauda acabou antes do esperado, volta ao início
+        fetched_tail = max(fetched_pages - self.top_pages, 0)
+        if tail_pages and fetched_tail == len(tail_pages):
+            next_cursor = tail_pages[-1] + 1
+        else:
+            next_cursor = self.top_pages + 1
+        conn.execute(
+            "INSERT OR REPLACE INTO refresh_state (key, value) VALUES ('tail_cursor', ?)",
+            (next_cursor,)
+        )
+        conn.execute("INSERT OR REPLACE INTO refresh_runs (run_ts) VALUES (?)", (self.run_ts,))
+        self.rotation_start = self._rotation_start(conn)
+        conn.execute("DELETE FROM refresh_runs WHERE run_ts < ?", (self.rotation_start,))
+        conn.commit()
+
+        snapshot = self.load_snapshot(conn)
+        conn.close()
+        return snapshot
+
+    def fresh_rows(self, snapshot):
+        """Rows of `snapshot` that were fetched by the last refresh()."""
+        return snapshot[snapshot["updated_at"] == self.run_ts]
+
+    def recent_rows(self, snapshot, max_staleness=None):
+        """
+        Rows of `snapshot` that can be screened and traded on: the ones refreshed during the
+        last full rotation of the tail pages (every page is fetched once in rotation_runs()
+        runs) or, with `max_staleness` (seconds), the ones refreshed at most that long ago.
+        Rows of coins that left the ranking stop being refreshed and fall out on their own.
+        """
+        if max_staleness is None:
+            if self.rotation_start is None:
+                conn = sqlite3.connect(self.db_path)
+                self.rotation_start = self._rotation_start(conn)
+                conn.close()
+            return snapshot[snapshot["updated_at"] >= self.rotation_start]
+        return snapshot[snapshot["staleness"] <= max_staleness]
+
+    def load_snapshot(self, conn=None):
+        """Return the merged snapshot with a `staleness` column in seconds."""
+        own_conn = conn is None
+        if own_conn:
+            conn = sqlite3.connect(self.db_path)
+        snapshot = pd.read_sql_query("SELECT * FROM market_snapshot", conn)
+        if own_conn:
+            conn.close()
+        snapshot["staleness"] = time.time() - snapshot["updated_at"]
+        return cast_integer_columns(snapshot)
+
+
+class MarketHistoryStore:
+    """
+    Append-only history of market snapshots, one row per (run_ts, coin id).
+    The primary key is (id, run_ts) in a WITHOUT ROWID table, so the rows of a coin
+    are stored together in time order and per-coin queries are index range scans.
+    """
+
+    def __init__(self, db_path=HISTORY_DB):
+        self.db_path = db_path
+        self.create_tables()
+
+    def create_tables(self):
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS market_history (
+                id TEXT NOT NULL,
+                run_ts INTEGER NOT NULL,
+                market_cap_rank REAL,
+                ath_change_percentage REAL,
+                ath_date TEXT,
+                total_volume REAL,
+                PRIMARY KEY (id, run_ts)
+            ) WITHOUT ROWID
+        ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_market_history_run_ts ON market_history (run_ts)")
+        conn.commit()
+        conn.close()
+
+    def append(self, df, run_ts=None):
+        """Append the rows of `df` (needs `id` and HISTORY_COLUMNS) under `run_ts` (unix seconds)."""
+        run_ts = int(run_ts if run_ts is not None else time.time())
+        rows = df[["id"] + HISTORY_COLUMNS].astype(object)
+        rows = rows.where(rows.notna(), None)
+        conn = sqlite3.connect(self.db_path)
+        with conn:
+            conn.executemany(f'''
+                INSERT OR IGNORE INTO market_history (id, run_ts, {", ".join(HISTORY_COLUMNS)})
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', ((row[0], run_ts) + row[1:] for row in rows.itertuples(index=False, name=None)))
+        conn.close()
+        return run_ts
+
+    def last_snapshots(self, ids, n=2):
+        """Return the last `n` snapshots of each coin in `ids`, newest first."""
+        ids = list(ids)
+        conn = sqlite3.connect(self.db_path)
+        df = pd.read_sql_query(f'''
+            SELECT id, run_ts, {", ".join(HISTORY_COLUMNS)}
+            FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY id ORDER BY run_ts DESC) AS rn
+                FROM market_history
+                WHERE id IN ({", ".join("?" * len(ids))})
+            )
+            WHERE rn <= ?
+            ORDER BY id, run_ts DESC
+        ''', conn, params=ids + [n])
+        conn.close()
+        return df
+
+    def daily_deltas(self, ids, days=1):
+        """
+        Compare the latest snapshot of each coin with the latest one taken at least
+        `days` days before it. Returns one row per coin with the rank,
+        ath_change_percentage and total_volume deltas.
+        """
+        ids = list(ids)
+        conn = sqlite3.connect(self.db_path)
+        df = pd.read_sql_query(f'''
+            WITH cur AS (
+                SELECT id, MAX(run_ts) AS run_ts
+                FROM market_history
+                WHERE id IN ({", ".join("?" * len(ids))})
+                GROUP BY id
+            )
+            SELECT c.id,
+                   c.run_ts,
+                   p.run_ts AS prev_run_ts,
+                   c.market_cap_rank,
+                   c.market_cap_rank - p.market_cap_rank AS rank_delta,
+                   c.ath_change_percentage,
+                   c.ath_change_percentage - p.ath_change_percentage AS ath_change_delta,
+                   c.total_volume,
+                   c.total_volume - p.total_volume AS volume_delta
+            FROM cur
+            JOIN market_history c ON c.id = cur.id AND c.run_ts = cur.run_ts
+            LEFT JOIN market_history p ON p.id = cur.id AND p.run_ts = (
+                SELECT MAX(run_ts) FROM market_history
+                WHERE id = cur.id AND run_ts <= cur.run_ts - ?
+            )
+        ''', conn, params=ids + [int(days * 86400)])
+        conn.close()
+        return df
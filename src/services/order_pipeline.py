@@ -0,0 +1,134 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from src.services.utils import calculate_precision
+
+class OrderPipeline:
+    """
+    Prepare and submit a batch of limit orders concurrently.
+    All candidates are prepared first (pair check and daily open prices fetched up front),
+    then submitted together with at most max_in_flight requests at a time.
+    Every order carries a deterministic newClientOrderId, so a retry of the same
+    order on the same day is rejected by the exchange instead of filling twice.
+    """
+
+    def __init__(self, mexc, max_in_flight=5, max_retries=2):
+        self.mexc = mexc
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+
+    def client_order_id(self, symbol, side, tag):
+        day = datetime.now(timezone.utc).strftime("%Y%m%d")
+        digest = hashlib.sha1(f"{day}:{tag}:{symbol}:{side}".encode("utf-8")).hexdigest()[:24]
+        return f"ath{digest}"
+
+    def prepare(self, candidates, prices, side="BUY"):
+        """
+        Turn (symbol, usd_amount, tag) candidates into orders.
+        Returns (orders, skipped) where skipped already holds the result entries.
+        """
+        orders = []
+        skipped = []
+        for symbol, usd_amount, tag in candidates:
+            pair_info = self.mexc.check_pair_exists(symbol)
+            if not (pair_info and pair_info["exists"]):
+                print(f"\nPair {symbol}USDT not found on MEXC SPOT market.")
+                skipped.append({"symbol": symbol, "tag": tag, "status": "NOT_FOUND"})
+                continue
+
+            open_price = prices.get(symbol)
+            if not open_price or open_price <= 0:
+                print(f"Open price for {symbol} could not be found.")
+                skipped.append({"symbol": symbol, "tag": tag, "status": "NO_PRICE"})
+                continue
+
+            print(f"\nPair {symbol}USDT found. Preparing to place order...")
+            orders.append({
+                "symbol": symbol,
+                "tag": tag,
+                "side": side,
+                "price": open_price,
+                "quantity": calculate_precision(usd_amount, open_price, pair_info["baseAssetPrecision"]),
+                "client_order_id": self.client_order_id(symbol, side, tag)
+            })
+        return orders, skipped
+
+    def submit(self, order, check_first=False):
+        """
+        Submit one order. After a network error the order is looked up by its client
+        order id before it is sent again, so an order the exchange already accepted is
+        never sent twice. check_first does that lookup before the first attempt.
+        """
+        check = check_first
+        for attempt in range(self.max_retries + 1):
+            submitted_at = time.time()
+            try:
+                if check:
+                    existing = self.mexc.get_order(order["symbol"], order["client_order_id"])
+                    if existing and "orderId" in existing:
+                        return dict(order, status="PLACED", response=existing, submitted_at=submitted_at)
+                response = self.mexc.place_limit_order(
+                    order["symbol"], order["price"], order["quantity"], order["side"],
+                    client_order_id=order["client_order_id"]
+                )
+            except requests.exceptions.RequestException as e:
+                print(f"Error submitting order for {order['symbol']} (attempt {attempt + 1}): {e}")
+                check = True
+                continue
+            status = "PLACED" if response and "orderId" in response else "REJECTED"
+            return dict(order, status=status, response=response, submitted_at=submitted_at)
+        return dict(order, status="ERROR", response=None, submitted_at=None)
+
+    def submit_batch(self, orders):
+        """
+        Submit several orders of one symbol through MexcAPI.place_limit_orders.
+        Orders left in an unknown state by a network error are reconciled by client
+        order id (and only then sent again) through submit(check_first=True).
+        """
+        submitted_at = time.time()
+        try:
+            responses = self.mexc.place_limit_orders(orders)
+        except requests.exceptions.RequestException as e:
+            print(f"Error submitting batch orders for {orders[0]['symbol']}: {e}")
+            responses = [None] * len(orders)
+        return [
+            self.submit(order, check_first=True) if response is None else
+            dict(order, status="PLACED" if "orderId" in response else "REJECTED",
+                 response=response, submitted_at=submitted_at)
+            for order, response in zip(orders, responses)
+        ]
+
+    def execute(self, candidates, side="BUY", batch=False):
+        """
+        Prepare and submit all candidates. Returns one result entry per candidate:
+        the skipped ones first, then the submitted ones in candidate order.
+        With batch=True, symbols with more than one order go through the batch order
+        endpoint (one symbol per batch); single orders are always sent concurrently.
+        """
+        prices = self.mexc.get_prices([symbol for symbol, _, _ in candidates], price_type="open")
+        orders, results = self.prepare(candidates, prices, side)
+
+        groups = {}
+        for index, order in enumerate(orders):
+            groups.setdefault(order["symbol"], []).append(index)
+        jobs = []
+        for indexes in groups.values():
+            if batch and len(indexes) > 1:
+                jobs.append(indexes)
+            else:
+                jobs.extend([index] for index in indexes)
+
+        def run(indexes):
+            chunk = [orders[index] for index in indexes]
+            return indexes, self.submit_batch(chunk) if len(chunk) > 1 else [self.submit(chunk[0])]
+
+        submitted = [None] * len(orders)
+        if jobs:
+            with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+                for indexes, chunk_results in executor.map(run, jobs):
+                    for index, result in zip(indexes, chunk_results):
+                        submitted[index] = result
+        results.extend(submitted)
+        return results
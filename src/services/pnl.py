@@ -0,0 +1,159 @@
+from collections import deque
+
+class FifoPnlEngine:
+    """
+    FIFO lot matching over the trades table.
+    BUY trades open lots and SELL trades close the oldest lots first, in (time, id) order.
+    The open lots and a per-symbol cursor are stored in the database, so each run only
+    processes the trades inserted since the previous one. The cursor keeps the highest
+    trades.id seen (to find new rows) and the (time, id) of the last trade matched; a
+    late-synced trade that sorts before it makes the symbol be replayed from scratch.
+    """
+
+    def __init__(self, db_manager):
+        self.db = db_manager
+        self.create_tables()
+
+    def create_tables(self):
+        conn = self.db.connect()
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS pnl_open_lots (
+                    id INTEGER PRIMARY KEY,
+                    symbol TEXT NOT NULL,
+                    trade_id TEXT,
+                    time INTEGER,
+                    quantity REAL NOT NULL,
+                    price REAL NOT NULL
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pnl_open_lots_symbol ON pnl_open_lots (symbol, id)")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS pnl_realized (
+                    id INTEGER PRIMARY KEY,
+                    symbol TEXT NOT NULL,
+                    buy_trade_id TEXT,
+                    sell_trade_id TEXT,
+                    quantity REAL NOT NULL,
+                    buy_price REAL NOT NULL,
+                    sell_price REAL NOT NULL,
+                    pnl REAL NOT NULL,
+                    open_time INTEGER,
+                    close_time INTEGER
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pnl_realized_symbol ON pnl_realized (symbol, close_time)")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS pnl_cursor (
+                    symbol TEXT PRIMARY KEY,
+                    last_row_id INTEGER NOT NULL,
+                    last_time INTEGER,
+                    last_id INTEGER
+                )
+            ''')
+            # Cursores antigos só têm last_row_id; sem a posição (time, id) o símbolo é reprocessado
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(pnl_cursor)")]
+            for column in ("last_time", "last_id"):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE pnl_cursor ADD COLUMN {column} INTEGER")
+
+    def _match(self, symbol, trades, lots):
+        """Run `trades` (sorted by time, id) through the FIFO `lots`. Returns the pnl_realized rows."""
+        realized = []
+        for row_id, trade_id, side, quantity, price, trade_time in trades:
+            if side == 'BUY':
+                lots.append([trade_id, trade_time, quantity, price])
+                continue
+
+            remaining = quantity
+            while remaining > 1e-12 and lots:
+                lot = lots[0]
+                matched = min(remaining, lot[2])
+                realized.append((
+                    symbol, lot[0], trade_id, matched, lot[3], price,
+                    (price - lot[3]) * matched, lot[1], trade_time
+                ))
+                lot[2] -= matched
+                remaining -= matched
+                if lot[2] <= 1e-12:
+                    lots.popleft()
+            if remaining > 1e-12:
+                print(f"Warning: SELL {trade_id} of {symbol} has {remaining} without matching BUY lots.")
+        return realized
+
+    def process(self):
+        """Match the trades inserted since the last run. Returns the number of trades processed."""
+        conn = self.db.connect()
+        cursors = {
+            row[0]: row[1:]
+            for row in conn.execute("SELECT symbol, last_row_id, last_time, last_id FROM pnl_cursor")
+        }
+        symbols = [row[0] for row in conn.execute("SELECT symbol FROM symbol_summary")]
+        trades_query = '''
+            SELECT id, trade_id, side, quantity, price, time
+            FROM trades
+            WHERE symbol = ? AND id > ?
+            ORDER BY time, id
+        '''
+
+        processed = 0
+        with conn:
+            for symbol in symbols:
+                last_row_id, last_time, last_id = cursors.get(symbol, (0, None, None))
+                trades = conn.execute(trades_query, (symbol, last_row_id)).fetchall()
+                if not trades:
+                    continue
+
+                # Trade nova anterior à última já casada: refaz o FIFO do símbolo desde o início
+                first = (trades[0][5], trades[0][0])
+                if last_row_id and (last_time is None or first < (last_time, last_id)):
+                    print(f"Out-of-order trades for {symbol}: replaying its FIFO history.")
+                    conn.execute("DELETE FROM pnl_realized WHERE symbol = ?", (symbol,))
+                    conn.execute("DELETE FROM pnl_open_lots WHERE symbol = ?", (symbol,))
+                    trades = conn.execute(trades_query, (symbol, 0)).fetchall()
+                    lots = deque()
+                else:
+                    lots = deque(
+                        list(row) for row in conn.execute(
+                            "SELECT trade_id, time, quantity, price FROM pnl_open_lots WHERE symbol = ? ORDER BY id",
+                            (symbol,)
+                        )
+                    )
+
+                realized = self._match(symbol, trades, lots)
+                conn.executemany('''
+                    INSERT INTO pnl_realized (symbol, buy_trade_id, sell_trade_id, quantity, buy_price, sell_price, pnl, open_time, close_time)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', realized)
+                conn.execute("DELETE FROM pnl_open_lots WHERE symbol = ?", (symbol,))
+                conn.executemany('''
+                    INSERT INTO pnl_open_lots (symbol, trade_id, time, quantity, price)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', [(symbol, *lot) for lot in lots])
+                conn.execute('''
+                    INSERT INTO pnl_cursor (symbol, last_row_id, last_time, last_id) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(symbol) DO UPDATE SET
+                        last_row_id = excluded.last_row_id,
+                        last_time = excluded.last_time,
+                        last_id = excluded.last_id
+                ''', (symbol, max(row[0] for row in trades), trades[-1][5], trades[-1][0]))
+                processed += len(trades)
+        return processed
+
+    def realized_pnl(self):
+        """Return (symbol, realized_pnl, closed_quantity) per symbol."""
+        return self.db.connect().execute('''
+            SELECT symbol, SUM(pnl), SUM(quantity)
+            FROM pnl_realized
+            GROUP BY symbol
+            ORDER BY SUM(pnl) DESC
+        ''').fetchall()
+
+    def open_positions(self):
+        """Return (symbol, open_quantity, cost_basis, avg_cost) per symbol with open lots."""
+        return self.db.connect().execute('''
+            SELECT symbol, SUM(quantity), SUM(quantity * price), SUM(quantity * price) / SUM(quantity)
+            FROM pnl_open_lots
+            GROUP BY symbol
+            ORDER BY SUM(quantity * price) DESC
+        ''').fetchall()
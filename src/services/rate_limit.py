@@ -0,0 +1,68 @@
+from datetime import datetime
+import threading
+import time
+
+class TokenBucket:
+    """
+    Token bucket limiter shared between threads.
+    `rate` calls are allowed every `per` seconds, with bursts of up to `capacity` calls.
+    """
+
+    def __init__(self, rate, per=60.0, capacity=None):
+        self.fill_rate = rate / per
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        if now <= self.updated_at:
+            return  # Nenhum token é gerado durante uma pausa
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.fill_rate)
+        self.updated_at = now
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available and consume them."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                else:
+                    wait = (tokens - self.tokens) / self.fill_rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Stop handing out tokens for `seconds` (e.g. after a 429 with Retry-After)."""
+        with self.lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            self.tokens = 0.0
+            self.updated_at = self.blocked_until
+
+
+def weighted_get(session, rate_limiter, url, params=None, weight=1, weight_per_minute=1200, max_retries=5):
+    """
+    GET on a Binance endpoint under `rate_limiter` (a TokenBucket of request weight).
+    On 418/429 waits Retry-After (or an exponential backoff) and retries up to
+    max_retries times; the last response is returned as is.
+    """
+    for attempt in range(max_retries + 1):
+        rate_limiter.acquire(weight)
+        response = session.get(url, params=params, timeout=30)
+        if response.status_code in (418, 429) and attempt < max_retries:
+            wait = float(response.headers.get("Retry-After", 2 ** attempt * 5))
+            print(f"Binance rate limit ({response.status_code}). Waiting {wait:.0f}s...")
+            rate_limiter.pause(wait)
+            continue
+        # Se o peso usado no minuto se aproxima do limite, desacelera todas as threads
+        used_weight = int(response.headers.get("X-MBX-USED-WEIGHT-1M", 0))
+        if used_weight > weight_per_minute * 0.9:
+            rate_limiter.pause(60 - datetime.now().second)
+        return response
@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+
+class TradeSync:
+    """
+    Incremental sync of the MEXC trade history into the trades database.
+    Each symbol keeps a cursor (last trade time and id) in trade_sync_cursor;
+    a sync only pages forward from it, several symbols in parallel, and upserts
+    on the exchange trade id.
+    """
+
+    def __init__(self, mexc, db_manager, max_workers=4):
+        self.mexc = mexc
+        self.db = db_manager
+        self.max_workers = max_workers
+
+    def sync(self, symbols=None):
+        """
+        Sync `symbols` (pairs like 'BTCUSDT') plus every symbol that already has a cursor.
+        Returns {symbol: number of trades fetched}.
+        """
+        cursors = self.db.get_sync_cursors()
+        symbols = sorted(set(symbols or []) | set(cursors))
+        print(f"Syncing trades for {len(symbols)} symbols...")
+
+        results = {}
+        errors = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.mexc.fetch_trades_since, symbol, cursors.get(symbol, (None, None))[0]): symbol
+                for symbol in symbols
+            }
+            # As escritas no SQLite ficam na thread principal
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    trades = future.result()
+                except requests.exceptions.RequestException as e:
+                    errors.append(f"{symbol}: {e}")
+                    continue
+                self.db.save_trades_and_cursor(symbol, trades)
+                results[symbol] = len(trades)
+
+        msg = f"Trades database updated: {sum(results.values())} trades from {len(results)} symbols"
+        if errors:
+            msg += f" ({len(errors)} errors: {'; '.join(errors)})"
+        print(msg)
+        if self.mexc.messenger:
+            self.mexc.messenger.send_message(msg)
+        return results
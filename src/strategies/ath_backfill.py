@@ -0,0 +1,169 @@
+import sys
+import os
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+import argparse
+import json
+import sqlite3
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from src.services.rate_limit import TokenBucket, weighted_get
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "../data/historical_high.db")
+CHECKPOINT_FILE = os.path.join(os.path.dirname(__file__), "../data/ath_backfill_checkpoint.json")
+
+class AthBackfill:
+    """
+    Recalcula o ATH (max high e data) de cada símbolo dos futuros da Binance
+    percorrendo todo o histórico diário desde a listagem.
+    Vários símbolos são processados em paralelo sob o limite de peso da Binance,
+    e cada símbolo concluído é salvo em um checkpoint para retomar uma execução interrompida.
+    Símbolos sem candles fechados ou com resposta inválida entram no checkpoint como
+    "skipped" (com o motivo); só erros de rede ficam pendentes para a próxima execução.
+    """
+    BASE_URL = "https://fapi.binance.com/fapi/v1"
+    KLINES_LIMIT = 1500
+    KLINES_WEIGHT = 10  # Peso de /klines com limit > 1000
+
+    def __init__(self, db_path=DB_PATH, checkpoint_file=CHECKPOINT_FILE, max_workers=8, weight_per_minute=1200):
+        self.db_path = db_path
+        self.checkpoint_file = checkpoint_file
+        self.max_workers = max_workers
+        self.weight_per_minute = weight_per_minute
+        self.rate_limiter = TokenBucket(weight_per_minute, per=60, capacity=self.KLINES_WEIGHT * max_workers)
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=max_workers))
+        self.checkpoint_lock = threading.Lock()
+        self.checkpoint = self.load_checkpoint()
+
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint_file, "r") as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save_checkpoint(self, symbol, max_high, ath_date, skipped=None):
+        with self.checkpoint_lock:
+            self.checkpoint[symbol] = {"max_high": max_high, "ath_date": ath_date}
+            if skipped:
+                self.checkpoint[symbol]["skipped"] = skipped
+            tmp_path = f"{self.checkpoint_file}.tmp"
+            with open(tmp_path, "w") as file:
+                json.dump(self.checkpoint, file)
+            os.replace(tmp_path, self.checkpoint_file)
+
+    def get_symbols(self):
+        """Return {symbol: onboardDate} for the USDT perpetual contracts."""
+        response = self.session.get(f"{self.BASE_URL}/exchangeInfo", timeout=30)
+        response.raise_for_status()
+        return {
+            item['symbol']: item.get('onboardDate', 0)
+            for item in response.json()['symbols']
+            if item['contractType'] == 'PERPETUAL' and item['symbol'].endswith('USDT')
+        }
+
+    def _get(self, path, params, max_retries=5):
+        response = weighted_get(
+            self.session, self.rate_limiter, f"{self.BASE_URL}{path}", params,
+            weight=self.KLINES_WEIGHT, weight_per_minute=self.weight_per_minute, max_retries=max_retries
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def find_ath(self, symbol, start_time=0):
+        """Page through all closed daily klines of `symbol` and return (max_high, ath_date)."""
+        now = int(time.time() * 1000)
+        max_high, ath_time = None, None
+        while True:
+            klines = self._get("/klines", {
+                'symbol': symbol,
+                'interval': '1d',
+                'startTime': start_time,
+                'limit': self.KLINES_LIMIT
+            })
+            for kline in klines:
+                if kline[6] >= now:
+                    continue  # Candle ainda aberto
+                high = float(kline[2])
+                if max_high is None or high > max_high:
+                    max_high, ath_time = high, kline[0]
+            if len(klines) < self.KLINES_LIMIT:
+                break
+            start_time = klines[-1][0] + 1
+        if max_high is None:
+            return None, None
+        ath_date = datetime.fromtimestamp(ath_time / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+        return max_high, ath_date
+
+    def write_highs(self, highs):
+        """Grava os ATHs calculados (o histórico completo é a referência) em uma transação."""
+        conn = sqlite3.connect(self.db_path)
+        with conn:
+            conn.executemany("""
+                INSERT INTO historical_high (symbol, max_high, ath_date, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(symbol) DO UPDATE
+                SET max_high = excluded.max_high,
+                    ath_date = excluded.ath_date,
+                    updated_at = CURRENT_TIMESTAMP
+            """, [(symbol, data["max_high"], data["ath_date"]) for symbol, data in highs.items()])
+        conn.close()
+
+    def run(self, symbols=None):
+        onboard_dates = self.get_symbols()
+        symbols = symbols or sorted(onboard_dates)
+        pending = [symbol for symbol in symbols if symbol not in self.checkpoint]
+        print(f"Backfilling ATH for {len(pending)} symbols ({len(symbols) - len(pending)} already in checkpoint)...")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.find_ath, symbol, onboard_dates.get(symbol, 0)): symbol
+                for symbol in pending
+            }
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    max_high, ath_date = future.result()
+                except requests.exceptions.RequestException as e:
+                    print(f"Error backfilling {symbol}: {e}")
+                    continue
+                except (KeyError, IndexError, TypeError, ValueError) as e:
+                    # Resposta inválida: pula só este símbolo
+                    print(f"Skipping {symbol}: malformed klines payload ({e!r})")
+                    self.save_checkpoint(symbol, None, None, skipped=f"malformed payload: {e!r}")
+                    continue
+                if max_high is None:
+                    print(f"Skipping {symbol}: no closed daily klines")
+                    self.save_checkpoint(symbol, None, None, skipped="no closed klines")
+                    continue
+                self.save_checkpoint(symbol, max_high, ath_date)
+                print(f"{symbol}: max_high {max_high} on {ath_date}")
+
+        done = [symbol for symbol in symbols if symbol in self.checkpoint]
+        highs = {symbol: self.checkpoint[symbol] for symbol in done if self.checkpoint[symbol]["max_high"] is not None}
+        self.write_highs(highs)
+        print(f"historical_high updated for {len(highs)} symbols ({len(done) - len(highs)} skipped).")
+        if len(done) == len(symbols) and os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)  # Execução completa: próximo backfill começa do zero
+        return highs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill do ATH pelo histórico diário completo da Binance Futures.")
+    parser.add_argument("symbols", nargs="*", help="Símbolos (padrão: todos os perpétuos USDT)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--weight", type=int, default=1200, help="Peso máximo por minuto")
+    parser.add_argument("--reset", action="store_true", help="Ignora o checkpoint existente")
+    args = parser.parse_args()
+
+    backfill = AthBackfill(max_workers=args.workers, weight_per_minute=args.weight)
+    if args.reset:
+        backfill.checkpoint = {}
+    backfill.run(args.symbols or None)
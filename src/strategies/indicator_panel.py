@@ -0,0 +1,127 @@
+import numpy as np
+from src.strategies.indicators import rsi
+
+PANEL_COLUMNS = ['open', 'high', 'close', 'volume']
+SMA_PERIODS = [7, 10, 20, 50, 100, 200]
+VOLUME_PERIODS = [7, 14, 20]
+# (período, desvio) das Bandas de Bollinger usadas nos setups
+BB_PARAMS = {10: 1.5, 20: 2, 50: 2.5}
+CLOSE_PERCENTAGE_PERIODS = [30, 90, 150]
+
+def align(series_list, width=None):
+    """
+    Empilha as séries (uma por símbolo) em um painel símbolos x dias alinhado à direita:
+    a última coluna é o último candle de cada símbolo e o histórico mais curto é completado com NaN.
+    """
+    width = width or max(len(series) for series in series_list)
+    panel = np.full((len(series_list), width), np.nan)
+    for row, series in enumerate(series_list):
+        values = np.asarray(series, dtype=float)[-width:]
+        panel[row, width - len(values):] = values
+    return panel
+
+def window_at(panel, window, col=-2):
+    """
+    Janela de `window` dias terminando na coluna `col`. Só o último candle fechado é usado
+    nos setups, então médias e desvios são calculados nessa janela, não no painel inteiro.
+    Retorna None se o painel não tem dias suficientes.
+    """
+    end = panel.shape[1] + col + 1 if col < 0 else col + 1
+    if end < window:
+        return None
+    return panel[:, end - window:end]
+
+def mean_at(panel, window, col=-2):
+    """SMA de `window` dias na coluna `col` (NaN se a janela tem dias faltando)."""
+    values = window_at(panel, window, col)
+    return values.mean(axis=1) if values is not None else np.full(panel.shape[0], np.nan)
+
+def std_at(panel, window, col=-2):
+    """Desvio padrão populacional (ddof=0) de `window` dias na coluna `col`."""
+    values = window_at(panel, window, col)
+    return values.std(axis=1) if values is not None else np.full(panel.shape[0], np.nan)
+
+def close_percentage_at(panel, window, col=-2):
+    """Só o valor na coluna `col` de indicators.close_percentage (closes anteriores abaixo do atual)."""
+    end = panel.shape[1] + col + 1 if col < 0 else col + 1
+    current = panel[:, end - 1]
+    below = (panel[:, max(end - 1 - window, 0):end - 1] < current[:, np.newaxis]).sum(axis=1)
+    return np.where(np.isnan(current), np.nan, np.round(below / window, 4))
+
+def close_percentages(close_panel, col=-2):
+    """Campos Close%_{30,90,150}d de symbol_data."""
+    return {
+        f"Close%_{period}d": close_percentage_at(close_panel, period, col)
+        for period in CLOSE_PERCENTAGE_PERIODS
+    }
+
+def setup_features(close, open_, volume, rsi_value, sma_rsi, smas, prev_smas, stds, volume_smas, max_high):
+    """
+    Monta os campos de symbol_data (exceto Days_Since_ATH e Close%) a partir dos valores no
+    último candle fechado. Todos os argumentos são arrays por símbolo; `smas`, `prev_smas`,
+    `stds` e `volume_smas` são dicts {período: array}.
+    """
+    bands = {period: (smas[period] + dev * stds[period], smas[period] - dev * stds[period]) for period, dev in BB_PARAMS.items()}
+
+    features = {
+        "RSI": rsi_value,
+        "Diff_ATH%": (close - max_high) / max_high,
+        "SMA_RSI": np.where(np.isnan(sma_rsi), np.inf, sma_rsi),
+    }
+    for period in [7, 20, 50, 100, 200]:
+        features[f"SMA_{period}"] = smas[period] > prev_smas[period]
+    for period in [7, 20, 50, 100, 200]:
+        features[f"SMA_S_{period}"] = smas[period] < prev_smas[period]
+
+    sma_50, sma_100, sma_200 = smas[50], smas[100], smas[200]
+    features["DIR_MAS"] = (sma_50 > sma_100) & (sma_100 > sma_200)
+    features["DIR_S_MAS"] = (sma_50 < sma_100) & (sma_100 < sma_200)
+    features["BB10_TOP"] = close > bands[10][0]
+    features["BB10_INF"] = close < smas[10]
+    features["BB10_BOT"] = close < bands[10][1]
+    features["BB20_BSUP"] = (close > smas[20]) & (close < bands[20][0])
+    features["BB20_INF"] = close < smas[20]
+    features["BB20_BOT"] = close < bands[20][1]
+    features["BB50_SUP"] = close > smas[50]
+    features["BB50_BOT"] = close < bands[50][1]
+
+    for period in VOLUME_PERIODS:
+        features[f"Vol%_{period}"] = volume / volume_smas[period]
+    features["VOLUME_FLAG"] = np.logical_and.reduce([features[f"Vol%_{period}"] > 1 for period in VOLUME_PERIODS])
+    features["Close"] = (close - open_) / open_
+    return features
+
+
+class IndicatorPanel:
+    """
+    Indicadores de todos os símbolos de uma vez sobre painéis símbolos x dias (numpy 2D),
+    no lugar de um DataFrame e de chamadas ao btalib/ta por símbolo.
+    """
+
+    def __init__(self, frames):
+        """`frames`: {symbol: DataFrame de klines diários com open, high, close e volume}."""
+        self.symbols = list(frames)
+        self.open, self.high, self.close, self.volume = (
+            align([df[column].values for df in frames.values()]) for column in PANEL_COLUMNS
+        )
+
+    def last_closed(self, max_high, col=-2):
+        """
+        Valores no último candle fechado (coluna -2) de cada símbolo, com os mesmos nomes de
+        symbol_data. `max_high` é o array de ATHs, na ordem de self.symbols.
+        """
+        rsi_panel = rsi(self.close, 14)
+        features = setup_features(
+            close=self.close[:, col],
+            open_=self.open[:, col],
+            volume=self.volume[:, col],
+            rsi_value=rsi_panel[:, col],
+            sma_rsi=mean_at(rsi_panel, 14, col),
+            smas={period: mean_at(self.close, period, col) for period in SMA_PERIODS},
+            prev_smas={period: mean_at(self.close, period, col - 1) for period in SMA_PERIODS},
+            stds={period: std_at(self.close, period, col) for period in BB_PARAMS},
+            volume_smas={period: mean_at(self.volume, period, col) for period in VOLUME_PERIODS},
+            max_high=max_high,
+        )
+        features.update(close_percentages(self.close, col))
+        return features
@@ -0,0 +1,180 @@
+import json
+import os
+import sqlite3
+import numpy as np
+from src.strategies.indicator_panel import (
+    SMA_PERIODS, VOLUME_PERIODS, BB_PARAMS, CLOSE_PERCENTAGE_PERIODS, align, close_percentages, setup_features
+)
+from src.strategies.indicators import rsi_averages, rsi_from_averages
+
+STATE_DB = os.path.join(os.path.dirname(__file__), "../data/indicator_state.db")
+RSI_PERIOD = 14
+HISTORY = 205  # Mesmo número de candles usado pela análise completa
+REBUILD_EVERY = 200  # Recalcula do zero de tempos em tempos para não acumular erro nas somas
+
+class StreamingIndicators:
+    """
+    Estado dos indicadores por símbolo salvo entre execuções: médias de ganho/perda do RSI
+    de Wilder, últimos 14 RSIs, somas (e somas dos quadrados, para as Bandas de Bollinger)
+    de cada janela de close e volume e as SMAs do candle anterior para os flags de tendência.
+    Cada candle fechado novo atualiza o estado em O(1); o valor que sai de cada janela é lido
+    do KlineStore. Sem estado válido, ele é reconstruído a partir dos últimos HISTORY candles.
+    """
+
+    def __init__(self, kline_store, db_path=STATE_DB):
+        self.kline_store = kline_store
+        self.db_path = db_path
+        self.create_tables()
+
+    def create_tables(self):
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS indicator_state (
+                symbol TEXT PRIMARY KEY,
+                last_ts INTEGER NOT NULL,
+                state TEXT NOT NULL
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def load(self):
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute("SELECT symbol, state FROM indicator_state").fetchall()
+        conn.close()
+        return {symbol: json.loads(state) for symbol, state in rows}
+
+    def save(self, states):
+        conn = sqlite3.connect(self.db_path)
+        with conn:
+            conn.executemany('''
+                INSERT INTO indicator_state (symbol, last_ts, state) VALUES (?, ?, ?)
+                ON CONFLICT(symbol) DO UPDATE SET last_ts = excluded.last_ts, state = excluded.state
+            ''', [(symbol, state['last_ts'], json.dumps(state)) for symbol, state in states.items()])
+        conn.close()
+
+    def build(self, closed):
+        """Estado completo a partir dos candles fechados (KLINE_DTYPE), como na análise de HISTORY candles."""
+        closed = closed[-(HISTORY - 1):]  # O candle aberto ocupa a última das HISTORY posições
+        close = np.asarray(closed['close'], dtype=float)
+        volume = np.asarray(closed['volume'], dtype=float)
+        bars = len(close)
+        avg_gain, avg_loss = rsi_averages(close, RSI_PERIOD)
+        rsi = rsi_from_averages(avg_gain, avg_loss)
+        return {
+            'last_ts': int(closed['timestamp'][-1]),
+            'bars': bars,
+            'since_build': 0,
+            'close': float(close[-1]),
+            'open': float(closed['open'][-1]),
+            'volume': float(volume[-1]),
+            'avg_gain': float(avg_gain[-1]),
+            'avg_loss': float(avg_loss[-1]),
+            'rsi': [float(value) for value in rsi[-RSI_PERIOD:]],
+            'sum': {str(period): float(close[-period:].sum()) for period in SMA_PERIODS},
+            'sumsq': {str(period): float((close[-period:] ** 2).sum()) for period in BB_PARAMS},
+            'volume_sum': {str(period): float(volume[-period:].sum()) for period in VOLUME_PERIODS},
+            'prev_sma': {
+                str(period): float(close[-period - 1:-1].mean()) if bars > period else float('nan')
+                for period in SMA_PERIODS
+            },
+        }
+
+    def advance(self, state, closed, index):
+        """Acrescenta o candle closed[index] ao estado (closed[index - 1] é o último já incluído)."""
+        close = float(closed['close'][index])
+        volume = float(closed['volume'][index])
+        bars = state['bars']
+
+        delta = close - state['close']
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        state['avg_gain'] = (state['avg_gain'] * (RSI_PERIOD - 1) + gain) / RSI_PERIOD
+        state['avg_loss'] = (state['avg_loss'] * (RSI_PERIOD - 1) + loss) / RSI_PERIOD
+        rsi = rsi_from_averages(np.float64(state['avg_gain']), np.float64(state['avg_loss']))
+        state['rsi'] = state['rsi'][1:] + [float(rsi)]
+
+        for period in SMA_PERIODS:
+            key = str(period)
+            state['prev_sma'][key] = state['sum'][key] / period if bars >= period else float('nan')
+            dropped = float(closed['close'][index - period]) if bars >= period else 0.0
+            state['sum'][key] += close - dropped
+            if period in BB_PARAMS:
+                state['sumsq'][key] += close ** 2 - dropped ** 2
+        for period in VOLUME_PERIODS:
+            dropped = float(closed['volume'][index - period]) if bars >= period else 0.0
+            state['volume_sum'][str(period)] += volume - dropped
+
+        state.update({
+            'last_ts': int(closed['timestamp'][index]),
+            'bars': bars + 1,
+            'since_build': state['since_build'] + 1,
+            'close': close,
+            'open': float(closed['open'][index]),
+            'volume': volume,
+        })
+        return state
+
+    def update(self, symbol, state=None):
+        """Leva o estado do símbolo até o último candle fechado do KlineStore."""
+        closed = self.kline_store.load(symbol)[:-1]  # O último candle ainda está aberto
+        if state is None or state['bars'] <= RSI_PERIOD or state['since_build'] >= REBUILD_EVERY:
+            return self.build(closed)
+
+        index = int(np.searchsorted(closed['timestamp'], state['last_ts']))
+        if index >= len(closed) or closed['timestamp'][index] != state['last_ts']:
+            return self.build(closed)  # Estado de um histórico que não existe mais
+        # Normalmente só um candle novo (O(1)); um dia sem rodar vira alguns passos
+        for new_index in range(index + 1, len(closed)):
+            state = self.advance(state, closed, new_index)
+        return state
+
+    def features(self, states, max_high):
+        """Campos de symbol_data (como IndicatorPanel.last_closed) a partir dos estados, na ordem de `states`."""
+        def column(key, period=None):
+            if period is None:
+                return np.array([state[key] for state in states.values()], dtype=float)
+            return np.array([state[key][str(period)] for state in states.values()], dtype=float)
+
+        bars = column('bars')
+        smas = {
+            period: np.where(bars >= period, column('sum', period) / period, np.nan)
+            for period in SMA_PERIODS
+        }
+        stds = {}
+        for period in BB_PARAMS:
+            variance = column('sumsq', period) / period - smas[period] ** 2
+            stds[period] = np.sqrt(np.maximum(variance, 0.0))
+        volume_smas = {
+            period: np.where(bars >= period, column('volume_sum', period) / period, np.nan)
+            for period in VOLUME_PERIODS
+        }
+        rsi_window = np.array([state['rsi'] for state in states.values()], dtype=float).reshape(len(states), -1)
+        sma_rsi = rsi_window.mean(axis=1) if rsi_window.shape[1] == RSI_PERIOD else np.full(len(states), np.nan)
+
+        return setup_features(
+            close=column('close'),
+            open_=column('open'),
+            volume=column('volume'),
+            rsi_value=rsi_window[:, -1],
+            sma_rsi=sma_rsi,
+            smas=smas,
+            prev_smas={period: column('prev_sma', period) for period in SMA_PERIODS},
+            stds=stds,
+            volume_smas=volume_smas,
+            max_high=max_high,
+        )
+
+    def run(self, symbols, max_high):
+        """
+        Atualiza e salva o estado de `symbols` (todos com klines no KlineStore) e retorna
+        os campos de symbol_data na mesma ordem.
+        """
+        saved = self.load()
+        states = {symbol: self.update(symbol, saved.get(symbol)) for symbol in symbols}
+        self.save(states)
+        features = self.features(states, max_high)
+        # Close% precisa da janela de closes, lida direto do KlineStore (+1 anterior e o candle aberto)
+        limit = max(CLOSE_PERCENTAGE_PERIODS) + 2
+        features.update(close_percentages(align([self.kline_store.load(symbol, limit)['close'] for symbol in symbols])))
+        return features
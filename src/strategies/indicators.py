@@ -0,0 +1,87 @@
+"""
+Indicadores vetorizados em numpy (no lugar de btalib e ta).
+Todas as funções aceitam um array 1D (uma série) ou 2D (símbolos x dias, com o tempo no
+último eixo) e retornam o mesmo formato. NaN no início de uma linha é tratado como
+histórico ausente, como no painel alinhado à direita do IndicatorPanel.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+def _as_2d(values):
+    values = np.asarray(values, dtype=float)
+    return (values[np.newaxis, :], True) if values.ndim == 1 else (values, False)
+
+def _restore(result, was_1d):
+    return result[0] if was_1d else result
+
+def _rolling(values, window, reducer, **kwargs):
+    panel, was_1d = _as_2d(values)
+    out = np.full(panel.shape, np.nan)
+    if panel.shape[1] >= window:
+        out[:, window - 1:] = reducer(sliding_window_view(panel, window, axis=1), axis=-1, **kwargs)
+    return _restore(out, was_1d)
+
+def sma(values, window):
+    """Média móvel simples; NaN enquanto a janela não está completa, como rolling(window).mean()."""
+    return _rolling(values, window, np.mean)
+
+def rolling_std(values, window, ddof=0):
+    """Desvio padrão móvel. ddof=0 como no `ta` (Bollinger); ddof=1 como rolling().std() do pandas."""
+    return _rolling(values, window, np.std, ddof=ddof)
+
+def bollinger(values, window=20, window_dev=2):
+    """Bandas de Bollinger como ta.volatility.BollingerBands: retorna (média, superior, inferior)."""
+    middle = sma(values, window)
+    std = rolling_std(values, window)
+    return middle, middle + window_dev * std, middle - window_dev * std
+
+def rma(values, period):
+    """
+    Média móvel de Wilder (SMMA) como no btalib: começa com a média simples dos primeiros
+    `period` valores válidos de cada linha e depois segue avg = (avg * (period - 1) + x) / period.
+    O loop é sobre os dias; cada passo atualiza todas as linhas de uma vez.
+    """
+    panel, was_1d = _as_2d(values)
+    rows, width = panel.shape
+    first = np.argmax(~np.isnan(panel), axis=1)
+    seed_col = first + period - 1
+    out = np.full(panel.shape, np.nan)
+    avg = np.full(rows, np.nan)
+    for col in range(width):
+        seeding = seed_col == col
+        if seeding.any():
+            avg[seeding] = panel[seeding, col - period + 1:col + 1].mean(axis=1)
+        running = seed_col < col
+        avg = np.where(running, (avg * (period - 1) + panel[:, col]) / period, avg)
+        out[:, col] = avg
+    return _restore(out, was_1d)
+
+def rsi_averages(values, period=14):
+    """Médias de Wilder dos ganhos e das perdas diárias (o primeiro delta de cada linha é NaN)."""
+    panel, was_1d = _as_2d(values)
+    delta = np.diff(panel, axis=1, prepend=np.nan)
+    valid = ~np.isnan(delta)
+    gain = np.where(valid, np.maximum(delta, 0.0), np.nan)
+    loss = np.where(valid, np.maximum(-delta, 0.0), np.nan)
+    return _restore(rma(gain, period), was_1d), _restore(rma(loss, period), was_1d)
+
+def rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - 100 / (1 + np.asarray(avg_gain) / np.asarray(avg_loss))
+
+def rsi(values, period=14):
+    """RSI de Wilder, igual a btalib.rsi(close, period=period)."""
+    return rsi_from_averages(*rsi_averages(values, period))
+
+def close_percentage(values, window):
+    """
+    Fração dos `window` closes anteriores abaixo do close atual, arredondada em 4 casas
+    (o divisor é sempre `window`; no começo da série só existem os closes disponíveis).
+    Janelas deslizantes sobre o painel completado com NaN à esquerda, sem loop por candle.
+    """
+    panel, was_1d = _as_2d(values)
+    padded = np.concatenate([np.full((panel.shape[0], window), np.nan), panel[:, :-1]], axis=1)
+    prior = sliding_window_view(padded, window, axis=1)
+    below = (prior < panel[:, :, np.newaxis]).sum(axis=-1)
+    out = np.where(np.isnan(panel), np.nan, np.round(below / window, 4))
+    return _restore(out, was_1d)
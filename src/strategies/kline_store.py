@@ -0,0 +1,88 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Registro de largura fixa: timestamp em ms (int64) + OHLCV (float64)
+KLINE_DTYPE = np.dtype([
+    ('timestamp', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+])
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+class KlineStore:
+    """
+    Append-only kline storage, one binary file per symbol (`{symbol}.klines`) made of
+    fixed-width KLINE_DTYPE records sorted by timestamp.
+    The layout is its own index: the record count is the file size divided by the
+    record size, and time ranges are found with a binary search on the timestamps.
+    Files are memory-mapped, so loading a window is a zero-copy slice, and appending
+    a candle (or replacing the last, still open, one) only writes the new records.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+
+    def path(self, symbol):
+        return os.path.join(self.data_dir, f"{symbol}.klines")
+
+    def count(self, symbol):
+        try:
+            return os.path.getsize(self.path(symbol)) // KLINE_DTYPE.itemsize
+        except FileNotFoundError:
+            return 0
+
+    def load(self, symbol, limit=None):
+        """Return the last `limit` records (all if None) as a read-only memmap view."""
+        count = self.count(symbol)
+        if count == 0:
+            return np.empty(0, dtype=KLINE_DTYPE)
+        records = np.memmap(self.path(symbol), dtype=KLINE_DTYPE, mode='r', shape=(count,))
+        return records[-limit:] if limit else records
+
+    def last_timestamp(self, symbol):
+        """Timestamp (ms) of the last stored candle, or None."""
+        records = self.load(symbol, limit=1)
+        return int(records['timestamp'][0]) if len(records) else None
+
+    def append(self, symbol, records):
+        """
+        Append records (KLINE_DTYPE array). Stored candles with a timestamp equal to or
+        after the first new one are replaced, so an open candle can be rewritten.
+        """
+        records = np.asarray(records, dtype=KLINE_DTYPE)
+        if len(records) == 0:
+            return
+        os.makedirs(self.data_dir, exist_ok=True)
+        path = self.path(symbol)
+        stored = self.load(symbol)
+        position = int(np.searchsorted(stored['timestamp'], records['timestamp'][0], side='left')) if len(stored) else 0
+        del stored
+
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as file:
+            file.seek(position * KLINE_DTYPE.itemsize)
+            file.truncate()
+            file.write(records.tobytes())
+
+    def from_dataframe(self, df):
+        """Convert a klines DataFrame (timestamp index or column) into KLINE_DTYPE records."""
+        if df.index.name == 'timestamp':
+            df = df.reset_index()
+        records = np.empty(len(df), dtype=KLINE_DTYPE)
+        timestamps = df['timestamp']
+        if pd.api.types.is_datetime64_any_dtype(timestamps):
+            timestamps = timestamps.to_numpy().astype('datetime64[ms]').astype('int64')
+        records['timestamp'] = timestamps
+        for column in OHLCV_COLUMNS:
+            records[column] = df[column].astype(float)
+        return records
+
+    def to_dataframe(self, records):
+        """Build the DataFrame used by RSIAnalyzer (timestamp index, float OHLCV columns)."""
+        df = pd.DataFrame({column: records[column] for column in OHLCV_COLUMNS})
+        df.index = pd.DatetimeIndex(records['timestamp'].astype('datetime64[ms]'))
+        df.index.name = 'timestamp'
+        return df
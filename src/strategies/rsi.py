@@ -1,6 +1,12 @@
 import warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
+import os
+import sys
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
 import requests
 from binance.client import Client
 from binance.helpers import round_step_size
@@ -8,7 +14,7 @@ from binance.exceptions import BinanceAPIException
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import btalib as bta
+from src.strategies import indicators
 import config
 import ast
 import sqlite3
@@ -194,22 +200,11 @@ def get_klines_date(symbol, interval, day, limit=15):
     df.set_index('timestamp', inplace=True)
     return df
 
-def rma(data, length):
-    alpha = 1.0 / length
-    result = np.zeros_like(data, dtype=float)
-
-    result[0] = data[0]
-
-    for i in range(1, len(data)):
-        result[i] = alpha * data[i] + (1 - alpha) * result[i - 1]
-
-    return result
-
 def calculate_rsi_for_day(symbol, interval, day):
     
     df = get_klines_date(symbol, interval, day, limit=100)
     df['close'] = df['close'].astype(float)
-    df['RSI'] = bta.rsi(df['close'],period=14).df
+    df['RSI'] = indicators.rsi(df['close'].values, period=14)
     rsi = df['RSI'][-1]
     
     return rsi
@@ -249,7 +244,7 @@ def check_trend_S(sma_1, sma_2):
 def get_last_closed_candle_rsi(symbol):
     df = get_klines(symbol, '1d', limit=21)
     df['close'] = df['close'].astype(float)
-    df['RSI'] = bta.rsi(df['close'],period=14).df
+    df['RSI'] = indicators.rsi(df['close'].values, period=14)
     return df['RSI']  # Return DataFrame containing RSI values
 
 def get_binance_futures_symbols():
@@ -321,7 +316,7 @@ for symbol in futures_symbols:
         df = get_klines(symbol, '1d', limit=205)
         df['close'] = df['close'].astype(float)
         df['open'] = df['open'].astype(float)
-        df['RSI'] = bta.rsi(df['close'], period = 14).df
+        df['RSI'] = indicators.rsi(df['close'].values, period=14)
         df['res'] = (df['close'] - df['open']) / df['open']
         df['volume'] = df['volume'].astype(float)
         max_high, ath_date = get_historical_high(symbol, DB_PATH)
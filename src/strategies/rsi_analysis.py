@@ -2,50 +2,129 @@ import warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
 from src.services.utils import load_exclusion_lists
-from src.configs.credentials import Credentials
-from datetime import datetime, timedelta
-from ta.volatility import BollingerBands
+from datetime import datetime
+from src.strategies.kline_store import KlineStore
+from src.strategies.indicator_panel import IndicatorPanel
+from src.strategies import indicators
+from src.strategies.indicator_state import StreamingIndicators
+from src.strategies.setup_rules import SetupRules
+from src.services.rate_limit import TokenBucket, weighted_get
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+import numpy as np
 import pandas as pd
 import sqlite3
-import time
 import os
 import requests
-import btalib as bta
 
-DATA_DIR = "/home/paulo/athchange/src/data/klines"
+DATA_DIR = os.path.join(os.path.dirname(__file__), "../data/klines")
+SYMBOL_DATA_FIELDS = [
+    "RSI", "Diff_ATH%", "Days_Since_ATH", "SMA_RSI",
+    "SMA_7", "SMA_20", "SMA_50", "SMA_100", "SMA_200",
+    "SMA_S_7", "SMA_S_20", "SMA_S_50", "SMA_S_100", "SMA_S_200",
+    "DIR_MAS", "DIR_S_MAS",
+    "BB10_TOP", "BB10_INF", "BB10_BOT", "BB20_BSUP", "BB20_INF", "BB20_BOT", "BB50_SUP", "BB50_BOT",
+    "Vol%_7", "Vol%_14", "Vol%_20", "VOLUME_FLAG",
+    "Close%_30d", "Close%_90d", "Close%_150d", "Close"
+]
+KLINE_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'close_time', 'quote_asset_volume', 'number_of_trades', 'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore']
+
+def empty_features():
+    """Tabela de features sem nenhum símbolo."""
+    features = pd.DataFrame({name: pd.Series(dtype=np.float32) for name in SYMBOL_DATA_FIELDS + ['RSI_Rank', 'RSI_Rank_ASC']})
+    features.index.name = 'symbol'
+    return features
+
+def compact_features(features):
+    """Cópia da tabela de features com as colunas numéricas em float32 (os bools ficam como estão)."""
+    return features.astype({name: np.float32 for name, dtype in features.dtypes.items() if dtype != bool})
+
+def features_to_symbol_data(features):
+    """
+    Adaptador para quem ainda usa o formato antigo: {symbol: {campo: valor}} com floats e
+    bools do Python e Days_Since_ATH inteiro (ou None).
+    """
+    symbol_data = features.astype(object).to_dict(orient='index')
+    for data in symbol_data.values():
+        for name, value in data.items():
+            if isinstance(value, np.generic):
+                data[name] = value.item()
+        days = data.get("Days_Since_ATH")
+        data["Days_Since_ATH"] = None if days is None or np.isnan(days) else int(days)
+    return symbol_data
 
 class RSIAnalyzer:
-    def __init__(self, exclusion_file):
+    BASE_URL = "https://fapi.binance.com/fapi/v1"
+
+    def __init__(self, exclusion_file, max_workers=8, weight_per_minute=1200, streaming_indicators=False):
         self.exclusion_data = load_exclusion_lists(exclusion_file)
         self.exclude_symbols = set(self.exclusion_data.get("fut_binance_exclude", []))  # Usando somente a lista da Binance Futures
         self.db_path = os.path.join(os.path.dirname(__file__), "../data/historical_high.db")
+        self.historical_highs = None  # {symbol: (max_high, ath_date)} carregado de uma vez
+        self.pending_highs = {}  # Novos ATHs gravados em lote no final da análise
+        self.kline_store = KlineStore(DATA_DIR)
+        # Modo incremental: estado dos indicadores salvo entre execuções, atualizado em O(1) por candle
+        self.indicator_state = StreamingIndicators(self.kline_store) if streaming_indicators else None
+        self.setup_rules = SetupRules()
+        self.features = None  # Tabela float64 da última análise, usada pelos setups
+        # Download concorrente: sessão com pool de conexões e limite de peso da Binance
+        self.max_workers = max_workers
+        self.weight_per_minute = weight_per_minute
+        self.rate_limiter = TokenBucket(weight_per_minute, per=60, capacity=weight_per_minute // 10)
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=max_workers))
 
     def save_klines(self, symbol, df):
-        """Salva os klines localmente em Parquet."""
-        os.makedirs(DATA_DIR, exist_ok=True)
-        file_path = f"{DATA_DIR}/{symbol}.parquet"
-
-        if df.index.name == 'timestamp':  
-            df = df.reset_index()  # Garante que timestamp seja uma coluna antes de salvar
-
-        print(df.head())
-        df.to_parquet(file_path, index=False)  # Salva sem índice oculto
-
-    def load_klines(self, symbol):
-        """Carrega os klines salvos localmente, se existirem."""
-        file_path = f"{DATA_DIR}/{symbol}.parquet"
+        """Acrescenta os klines ao armazenamento local (substitui o último candle se repetido)."""
+        self.kline_store.append(symbol, self.kline_store.from_dataframe(df))
+
+    def load_klines(self, symbol, limit=None):
+        """Carrega os últimos `limit` klines salvos localmente, se existirem."""
+        if self.kline_store.count(symbol) == 0:
+            self.import_parquet_klines(symbol)
+        records = self.kline_store.load(symbol, limit)
+        if len(records) == 0:
+            return None  # Retorna None se não houver dados salvos
+        return self.kline_store.to_dataframe(records)
+
+    def import_parquet_klines(self, symbol):
+        """
+        Migra o arquivo Parquet antigo do símbolo, se existir, para o KlineStore.
+        Um arquivo corrompido ou sem as colunas esperadas é ignorado: o símbolo
+        fica vazio e get_klines_cached baixa o histórico completo.
+        """
+        file_path = os.path.join(self.kline_store.data_dir, f"{symbol}.parquet")
+        if not os.path.exists(file_path):
+            return
         try:
             df = pd.read_parquet(file_path)
-            #print(df.head())
-            df['timestamp'] = pd.to_datetime(df['timestamp'])  # Converte para datetime
-            df.set_index('timestamp', inplace=True)  # Define como índice
-            return df
-        except FileNotFoundError:
-            return None  # Retorna None se o arquivo não existir
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
+            records = self.kline_store.from_dataframe(df.sort_values('timestamp'))
+        except (ImportError, OSError, KeyError, TypeError, ValueError) as e:
+            # ArrowInvalid é um ValueError; sem pyarrow/fastparquet, ImportError
+            print(f"Ignoring legacy parquet for {symbol} ({e!r}); downloading the full history.")
+            return
+        self.kline_store.append(symbol, records)
+
+    def kline_weight(self, limit):
+        """Peso de /klines na Binance Futures conforme o limit."""
+        if limit < 100:
+            return 1
+        if limit < 500:
+            return 2
+        if limit <= 1000:
+            return 5
+        return 10
+
+    def _get(self, path, params=None, weight=1, max_retries=5):
+        """GET na Binance respeitando o peso por minuto; espera e repete em 418/429."""
+        return weighted_get(
+            self.session, self.rate_limiter, f"{self.BASE_URL}{path}", params,
+            weight=weight, weight_per_minute=self.weight_per_minute, max_retries=max_retries
+        )
 
     def get_binance_futures_symbols(self):
-        url = 'https://fapi.binance.com/fapi/v1/exchangeInfo'
-        response = requests.get(url)
+        response = self._get("/exchangeInfo")
         if response.status_code == 200:
             data = response.json()
             symbols = [item['symbol'] for item in data['symbols'] if item['contractType'] == 'PERPETUAL' and item['symbol'].endswith('USDT')]
@@ -54,52 +133,62 @@ class RSIAnalyzer:
             print('Failed to fetch data from Binance API.')
             return []
 
-    def get_klines(self, symbol, interval, limit=10):
-        base_url = "https://fapi.binance.com/fapi/v1/klines"
+    def get_klines(self, symbol, interval, limit=10, start_time=None):
         params = {
             'symbol': symbol,
             'interval': interval,
             'limit': limit
         }
-        response = requests.get(base_url, params=params)
+        if start_time is not None:
+            params['startTime'] = start_time
+        response = self._get("/klines", params, weight=self.kline_weight(limit))
+        response.raise_for_status()
         klines = response.json()
-        df = pd.DataFrame(klines, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume', 'close_time', 'quote_asset_volume', 'number_of_trades', 'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'])
+        df = pd.DataFrame(klines, columns=KLINE_COLUMNS)
         df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
         df.set_index('timestamp', inplace=True)
         return df
 
+    def get_klines_since(self, symbol, interval, start_time, page_limit=99):
+        """
+        Busca todos os klines a partir de start_time (ms), paginando se necessário.
+        Normalmente são só 1 ou 2 candles novos, então páginas de até 99 (peso 1).
+        """
+        pages = []
+        while True:
+            df = self.get_klines(symbol, interval, limit=page_limit, start_time=start_time)
+            pages.append(df)
+            if len(df) < page_limit:
+                break
+            start_time = int(df.index[-1].value // 10**6) + 1
+        return pd.concat(pages) if len(pages) > 1 else pages[0]
+
     def get_klines_cached(self, symbol, interval='1d', limit=205):
-        """Busca klines da Binance e atualiza apenas os dados novos."""
-        saved_df = self.load_klines(symbol)
-        #print(saved_df.head())
-        
-        if saved_df is not None and not saved_df.empty:
-            last_timestamp = saved_df.index.max()
-            new_df = self.get_klines(symbol, interval, limit)  # Pega os novos dados
-            new_df = new_df[new_df.index > last_timestamp]  # Agora compara corretamente
-            
-            if not new_df.empty:
-                updated_df = pd.concat([saved_df, new_df], ignore_index=True)
-                self.save_klines(symbol, updated_df)
-                return updated_df
-            return saved_df  # Se não houver novos dados, retorna os já salvos
+        """
+        Busca na Binance apenas os klines a partir do último salvo (startTime) e
+        retorna os últimos `limit` candles, com o índice de timestamp preservado.
+        """
+        if self.kline_store.count(symbol) == 0:
+            self.import_parquet_klines(symbol)
+        last_timestamp = self.kline_store.last_timestamp(symbol)
+
+        if last_timestamp is not None:
+            # O último candle salvo pode estar incompleto: é buscado de novo e substituído
+            new_df = self.get_klines_since(symbol, interval, last_timestamp)
         else:
-            df = self.get_klines(symbol, interval, limit)  # Primeira vez, pega tudo
-            #print(df.columns)
-            self.save_klines(symbol, df)
-            return df
+            new_df = self.get_klines(symbol, interval, limit)  # Primeira vez, pega tudo
+
+        if not new_df.empty:
+            self.save_klines(symbol, new_df)
+        return self.load_klines(symbol, limit)
 
     def calculate_rsi(self, df, period=14):
-        """Cálculo simplificado do RSI."""
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        df['RSI'] = 100 - (100 / (1 + rs))
+        """RSI de Wilder (igual ao btalib), calculado com o módulo indicators."""
+        df['RSI'] = indicators.rsi(df['close'].values, period)
         return df
 
     def calculate_sma(self, data, period):
-        return data.rolling(window=period).mean()
+        return pd.Series(indicators.sma(data.values, period), index=data.index)
 
     def check_trend(self, sma_1, sma_2):
         return sma_1 > sma_2
@@ -109,52 +198,51 @@ class RSIAnalyzer:
 
     def calculate_close_percentage(self, series, window):
         """Calculate the percentage of prior closes lower than the current close."""
-        result = []
-        for i in range(len(series)):
-            if i < window:
-                past_window = series[:i]
-                current_close = series[i]
-                higher_days = (past_window < current_close).sum()
-                pct = higher_days / window
-            else:
-                past_window = series[i - window:i]
-                current_close = series[i]
-                pct = (past_window < current_close).sum() / window
-            result.append(round(pct, 4))
-        return result
+        return indicators.close_percentage(series.values, window).tolist()
 
     def calc_bb(self, data, period, std_dev, band="upper"):
-        sma = data.rolling(window=period).mean()
-        std = data.rolling(window=period).std()
-        
+        sma = indicators.sma(data.values, period)
+        std = indicators.rolling_std(data.values, period, ddof=1)
+
         if band == "upper":
-            return sma + (std * std_dev)
+            return pd.Series(sma + (std * std_dev), index=data.index)
         elif band == "lower":
-            return sma - (std * std_dev)
+            return pd.Series(sma - (std * std_dev), index=data.index)
         else:
             raise ValueError("Parâmetro 'band' deve ser 'upper' ou 'lower'.")
 
-    def register_new_high(self, symbol):
-        """Registra um novo símbolo no banco de dados com base no maior valor histórico."""
-        df = self.get_klines(symbol, '1d', limit=60)
-        print(df)
-        max_high_row = df.loc[df['high'].idxmax()]
-        max_high = float(max_high_row['high'])
+    def register_new_high(self, symbol, df=None):
+        """
+        Registra um novo símbolo com base no maior valor dos klines disponíveis
+        (os já baixados pela análise, se informados). O ATH completo vem do ath_backfill.
+        """
+        if df is None:
+            df = self.get_klines(symbol, '1d', limit=60)
+        highs = df['high'].astype(float)
+        max_high = float(highs.max())
+        max_high_row = df.loc[highs.idxmax()]
         ath_date = self.timestamp_to_text(max_high_row.name)
 
-        conn = sqlite3.connect(self.db_path)
-        conn.execute(
-            "INSERT INTO historical_high (symbol, max_high, ath_date) VALUES (?, ?, ?)",
-            (symbol, max_high, ath_date)
-        )
-        conn.commit()
-        conn.close()
+        self.queue_historical_high(symbol, max_high, ath_date)
         
         print(f"Registered new symbol {symbol} with max_high: {max_high}")
         return max_high, ath_date
 
+    def load_historical_highs(self):
+        """Carrega todos os ATHs do banco em memória com um único SELECT."""
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute("SELECT symbol, max_high, ath_date FROM historical_high").fetchall()
+        conn.close()
+        self.historical_highs = {
+            symbol: (max_high, pd.to_datetime(ath_date)) for symbol, max_high, ath_date in rows
+        }
+        self.pending_highs = {}
+        return self.historical_highs
+
     def get_historical_high(self, symbol):
-        """Consulta o banco de dados para recuperar o ATH."""
+        """Consulta o ATH em memória (ou no banco, se ainda não foi carregado)."""
+        if self.historical_highs is not None:
+            return self.historical_highs.get(symbol, (None, None))
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         cursor.execute("SELECT max_high, ath_date FROM historical_high WHERE symbol = ?", (symbol,))
@@ -173,186 +261,67 @@ class RSIAnalyzer:
         else:
             raise ValueError("O parâmetro 'date' deve ser um objeto datetime ou um timestamp.")
 
-    def update_historical_highs(self, symbol, high, date):
+    def queue_historical_high(self, symbol, high, date):
+        """Atualiza o ATH em memória e agenda a gravação no banco."""
+        self.pending_highs[symbol] = (high, date)
+        if self.historical_highs is not None:
+            self.historical_highs[symbol] = (high, pd.to_datetime(date))
+
+    def flush_historical_highs(self):
+        """Grava todos os ATHs pendentes com um único executemany em uma transação."""
+        if not self.pending_highs:
+            return 0
         conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO historical_high (symbol, max_high, ath_date, updated_at)
-            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-            ON CONFLICT(symbol) DO UPDATE 
-            SET max_high = MAX(historical_high.max_high, excluded.max_high),
-                ath_date = CASE 
-                              WHEN excluded.max_high > historical_high.max_high THEN excluded.ath_date 
-                              ELSE historical_high.ath_date 
-                           END,
-                updated_at = CURRENT_TIMESTAMP
-        """, (symbol, high, date))
-        conn.commit()
+        with conn:
+            conn.executemany("""
+                INSERT INTO historical_high (symbol, max_high, ath_date, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(symbol) DO UPDATE 
+                SET max_high = MAX(historical_high.max_high, excluded.max_high),
+                    ath_date = CASE 
+                                  WHEN excluded.max_high > historical_high.max_high THEN excluded.ath_date 
+                                  ELSE historical_high.ath_date 
+                               END,
+                    updated_at = CURRENT_TIMESTAMP
+            """, [(symbol, high, date) for symbol, (high, date) in self.pending_highs.items()])
         conn.close()
+        flushed = len(self.pending_highs)
+        self.pending_highs = {}
+        return flushed
 
-    def update_if_new_high(self, symbol, new_high, new_date):
-        """Atualiza o banco de dados se um novo ATH for encontrado."""
+    def update_historical_highs(self, symbol, high, date):
+        self.queue_historical_high(symbol, high, date)
+        self.flush_historical_highs()
+
+    def update_if_new_high(self, symbol, new_high, new_date, df=None):
+        """Atualiza o ATH em memória se um novo ATH for encontrado (gravado em flush_historical_highs)."""
         current_high, ath_date = self.get_historical_high(symbol)
         
         #print(f"Symbol: {symbol}, new_high {new_high:.2f}, new_date {new_date}, current_high {current_high},  current_date {ath_date}!!!!")
         if current_high is None:
-            current_high, ath_date = self.register_new_high(symbol)
+            current_high, ath_date = self.register_new_high(symbol, df)
             return True
             
         if new_high > current_high:
             dt = self.timestamp_to_text(new_date)
             #print(f"Atualizando high de {symbol} no valor de {new_high} e data {dt}")
-            self.update_historical_highs(symbol, new_high, dt)
+            self.queue_historical_high(symbol, new_high, dt)
             return True
         return False
       
-    def filter_symbols_based_on_conditions(self, symbol_data, top_n, conditions):
+    def processar_symbols(self, features=None):
         """
-        Função genérica para filtrar os símbolos baseados nas condições fornecidas.
-        :param symbol_data: Dicionário com os dados dos símbolos
-        :param top_n: Número de símbolos a ser considerado
-        :param conditions: Lista de condições de filtragem a serem aplicadas
-        :return: Lista com os símbolos que atendem às condições
+        Aplica os setups declarados em configs/setup_rules.json sobre a tabela de features
+        (ou um symbol_data antigo com RSI_Rank e RSI_Rank_ASC) e retorna {setup: [símbolos]}.
+        Sem argumento, usa os valores float64 da última run_rsi_analysis, e não a tabela
+        float32 retornada: um RSI como 65.000001 vira 65.0 em float32 e mudaria o setup.
         """
-        sorted_symbols = sorted(symbol_data.items(), key=lambda x: x[1]['RSI'], reverse=True)[:top_n]
-        filtered_symbols = []
-        
-        for symbol, data in sorted_symbols:
-            if all(cond(data) for cond in conditions):
-                filtered_symbols.append(symbol)
-        
-        return filtered_symbols
-      
-    def condition_l_15_st1(self, data):
-        return float(data['Close']) < 0.09 and float(data['RSI']) < 80 and data['SMA_50'] == True
-
-    def condition_l_15_st2(self, data):
-        return float(data['Close']) < 0.09 and float(data['RSI']) < 80 and float(data['SMA_RSI']) < 70 and data['SMA_50'] == True and data['SMA_200'] == True
-
-    def condition_l_5_st1(self, data):
-        return data['Close'] > -0.08 and data['Close'] < 0.06 and data['RSI'] < 65 and data['SMA_50'] == True
+        if features is None:
+            features = self.features if self.features is not None else empty_features()
+        if isinstance(features, dict):
+            features = pd.DataFrame.from_dict(features, orient='index')
+        return self.setup_rules.evaluate(features)
 
-    def condition_l_5_st2(self, data):
-        return data['Close'] > -0.08 and data['Close'] < 0.06 and data['RSI'] > 65 and data['SMA_50'] == True and data['SMA_100'] == True and data['SMA_200'] == True and data['DIR_MAS'] == True
-
-    def condition_s_15(self, data):
-        return data['Close'] < -0.03 and data['RSI'] > 25 and data['RSI'] < 40 and data['SMA_S_50'] == True and data['SMA_S_100'] == True and data['DIR_S_MAS'] == True
-
-    def condition_s_5(self, data):
-        return data['RSI'] > 25 and data['RSI'] < 40 and data['SMA_S_50'] == True and data['SMA_S_100'] == True
-
-    def condition_d1_w(self, data):
-        return data['RSI'] > 80 and float(data['SMA_RSI']) < 75 and (data['RSI'] - float(data['SMA_RSI'])) > 15 and data['SMA_S_50'] == True and data['Close'] > 0.03 and data['Close'] < 0.6
-
-    def condition_d1_d(self, data):
-        return data['RSI'] > 80 and float(data['SMA_RSI']) < 75 and (data['RSI'] - float(data['SMA_RSI'])) > 0 and (data['RSI'] - float(data['SMA_RSI'])) < 20 and data['SMA_S_50'] == True and data['Close'] > 0.03 and data['Close'] < 0.6
-
-    def condition_d1_l1(self, data):
-        return data['RSI'] > 65 and data['RSI'] < 95 and float(data['SMA_RSI']) < 70 and float(data['SMA_RSI']) > 60
-            
-    def condition_d1_l2(self, data, rsi_quartil):
-        return data['RSI'] > 65 and data['RSI'] < 75 and 0.06 < rsi_quartil < 0.45
-
-    def condition_d1_l4(self, data):
-        return data['RSI'] > 65 and data['RSI'] < 95 and ((float(data['SMA_RSI']) > 75 and  float(data['SMA_RSI']) < 80) or float(data['SMA_RSI']) < 60) and data['Diff_ATH%'] > -0.25
-
-    def condition_d1_l5(self, data):
-        return data['RSI'] > 70 and data['RSI'] < 90 and data['Days_Since_ATH'] < 5
-
-    def condition_d1_n1(self, data):
-        return (55 < data['RSI'] < 65 and all([data['SMA_7'], data['SMA_20'], data['SMA_50'], data['SMA_100']])
-                and not data['SMA_200'])
-                
-    def condition_d1_n2_bb1(self, data):
-        return data['RSI'] > 55 and data['RSI'] < 65 and all([data['BB10_INF'], data['BB20_BSUP'], data['BB50_SUP']])
-        
-    def condition_d1_n2_bb2(self, data):
-        return data['RSI'] > 57 and data['RSI'] < 65 and all([data['BB10_TOP'], data['BB20_BSUP'], data['BB50_SUP']])
-        
-    def condition_d1_n2_bb3(self, data):
-        return data['RSI'] > 30 and data['RSI'] < 65  and all([data['BB10_INF'], data['BB20_INF'], data['BB50_SUP']])
-
-    def condition_d1_n3(self, data):
-        return data['RSI'] > 60 and data['RSI'] < 65 and data['Diff_ATH%'] > -0.08
-
-    def condition_d1_b1(self, data):
-        return data['RSI'] < 28 and float(data['SMA_RSI']) > 30
-        
-    def condition_d1_b2(self, data):
-        return data['RSI'] < 28 and all([data['BB10_BOT'], data['BB20_BOT'], data['BB50_BOT']])
-
-    def condition_d1_b3(self, data, rsi_quartil_asc):
-        return data['RSI'] < 28 and rsi_quartil_asc > 0.12
-        
-    def processar_symbols(self, symbol_data):
-        qty_items_all = len(symbol_data)
-        listas = {
-            'L_15_ST1': [],
-            'L_15_ST2': [],
-            'L_5_ST1': [],
-            'L_5_ST2': [],
-            'S_15': [],
-            'S_5': [],
-            'D1_W': [],
-            'D1_D': [],
-            'D1_L1': [],
-            'D1_L2': [],
-            'D1_L4': [],
-            'D1_L5': [],
-            'D1_N1': [],
-            'D1_N2_BB1': [],
-            'D1_N2_BB2': [],
-            'D1_N2_BB3': [],
-            'D1_N3': [],
-            'D1_B1': [],
-            'D1_B2': [],
-            'D1_B3': []
-        }
-
-        # Filtra símbolos e atualiza as listas
-        listas['L_15_ST1'] = self.filter_symbols_based_on_conditions(symbol_data, 5, [self.condition_l_15_st1])
-        listas['L_15_ST2'] = self.filter_symbols_based_on_conditions(symbol_data, 5, [self.condition_l_15_st2])
-        listas['L_5_ST1'] = self.filter_symbols_based_on_conditions(symbol_data, 5, [self.condition_l_5_st1])
-        listas['L_5_ST2'] = self.filter_symbols_based_on_conditions(symbol_data, 10, [self.condition_l_5_st2])
-        listas['S_15'] = self.filter_symbols_based_on_conditions(symbol_data, 30, [self.condition_s_15])
-        listas['S_5'] = self.filter_symbols_based_on_conditions(symbol_data, 20, [self.condition_s_5])
-        listas['D1_W'] = self.filter_symbols_based_on_conditions(symbol_data, 20, [self.condition_d1_w])
-        listas['D1_D'] = self.filter_symbols_based_on_conditions(symbol_data, 10, [self.condition_d1_d])
-        
-        sorted_symbols_daily_all = sorted(symbol_data.items(), key=lambda x: x[1]['RSI'], reverse=True)
-        for symbol, data in sorted_symbols_daily_all:
-            rsi_quartil = data['RSI_Rank'] / qty_items_all
-            rsi_quartil_asc = data['RSI_Rank_ASC'] / qty_items_all
-            #print(f"Symbol: {symbol}, rsi_quartil RSI: {rsi_quartil}")
-
-            if self.condition_d1_l1(data):
-                listas['D1_L1'].append(symbol)
-            if self.condition_d1_l2(data, rsi_quartil):
-                listas['D1_L2'].append(symbol)
-            if self.condition_d1_l4(data):
-                listas['D1_L4'].append(symbol)
-            if self.condition_d1_l5(data):
-                listas['D1_L5'].append(symbol)
-            if self.condition_d1_n1(data):
-                listas['D1_N1'].append(symbol)
-            if self.condition_d1_n2_bb1(data):
-                listas['D1_N2_BB1'].append(symbol)
-            if self.condition_d1_n2_bb2(data):
-                listas['D1_N2_BB2'].append(symbol)
-            if self.condition_d1_n2_bb3(data):
-                listas['D1_N2_BB3'].append(symbol)
-            if self.condition_d1_n3(data):
-                listas['D1_N3'].append(symbol)
-            if self.condition_d1_b1(data):
-                listas['D1_B1'].append(symbol)
-            if self.condition_d1_b2(data):
-                listas['D1_B2'].append(symbol)
-            if self.condition_d1_b3(data, rsi_quartil_asc):
-                listas['D1_B3'].append(symbol)
-
-
-        return listas      
-    
     def atualizar_config(self, arquivo_config, variaveis):
         with open(arquivo_config, 'r') as file:
             linhas = file.readlines()
@@ -411,141 +380,86 @@ class RSIAnalyzer:
 
         self.atualizar_config('/mnt/e/Backup_Paulo/multitradeBot/setups.py', symbols_swingtrade_corrigido)
     
+    def fetch_klines(self, symbols, interval='1d', limit=205):
+        """
+        Baixa os klines dos símbolos em paralelo (max_workers threads, sob o limite de peso)
+        e entrega (symbol, df) na ordem em que chegam.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.get_klines_cached, symbol, interval, limit): symbol for symbol in symbols}
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    df = future.result()
+                except requests.exceptions.RequestException as e:
+                    print(f"Error fetching klines for {symbol}: {e}")
+                    continue
+                yield symbol, df
+
+    def update_symbol_ath(self, symbol, df):
+        """Atualiza o ATH do símbolo com o último candle fechado e retorna (max_high, days_since_ath)."""
+        max_high, ath_date = self.get_historical_high(symbol)
+        new_high = float(df['high'].iloc[-2])
+        new_date = df.index[-2]
+
+        if self.update_if_new_high(symbol, new_high, new_date, df):
+            max_high, ath_date = new_high, new_date
+
+        days_since_ath = (df.index[-2] - pd.to_datetime(ath_date)).days if ath_date else None
+        return max_high, days_since_ath
+
+    def build_features(self, frames, ath_info):
+        """
+        Calcula os indicadores de todos os símbolos de uma vez (painel ou estado incremental)
+        e monta a tabela de features: uma linha por símbolo, só com os valores do último
+        candle fechado, colunas float64 ou bool, mais RSI_Rank e RSI_Rank_ASC.
+        """
+        symbols = list(frames)
+        max_high = np.array([ath_info[symbol][0] for symbol in symbols], dtype=float)
+        if self.indicator_state is not None:
+            values = self.indicator_state.run(symbols, max_high)
+        else:
+            values = IndicatorPanel(frames).last_closed(max_high)
+        values["Days_Since_ATH"] = np.array(
+            [np.nan if ath_info[symbol][1] is None else ath_info[symbol][1] for symbol in symbols], dtype=float
+        )
+
+        features = pd.DataFrame(
+            {name: values[name] for name in SYMBOL_DATA_FIELDS},
+            index=pd.Index(symbols, name='symbol'),
+        )
+        features['RSI_Rank'] = features['RSI'].rank(ascending=False, method='dense')
+        features['RSI_Rank_ASC'] = features['RSI'].rank(ascending=True, method='dense')
+        return features
+
     def run_rsi_analysis(self):
         """Fluxo principal do cálculo de RSI e análise."""
         symbols = self.get_binance_futures_symbols()
         #symbols = ['XRPUSDT']
         filtered_symbols = [s for s in symbols if s not in self.exclude_symbols]
 
-        rsi_data = []
-        symbol_data = {}
-
-        for symbol in filtered_symbols:
-            #print(f"Symbol: {symbol}")
-            df = self.get_klines(symbol, '1d', limit=205)
-            #df = self.get_klines_cached(symbol, '1d', limit=205)
-
-            
-            if len(df) < 15:
-                print(f"Symbol {symbol} possui menos de 15 klines. Interrompendo o loop.")
-                break
-            
-            df['close'] = df['close'].astype(float)
-            df['open'] = df['open'].astype(float)
-            df['volume'] = df['volume'].astype(float)    
-            df['RSI'] = bta.rsi(df['close'], period = 14).df
-            df['res'] = (df['close'] - df['open']) / df['open']
-
-            # Recuperar histórico e calcular novos valores
-            max_high, ath_date = self.get_historical_high(symbol)
-            new_high = float(df['high'].iloc[-2])
-            new_date = df.index[-2]
-
-            if self.update_if_new_high(symbol, new_high, new_date):
-                max_high, ath_date = new_high, new_date
-
-            days_since_ath = (df.index[-2] - pd.to_datetime(ath_date)).days if ath_date else None
-            df['Max_High'] = max_high
-            df['Diff_ATH%'] = (df['close'] - max_high) / max_high
-            df['Days_Since_ATH'] = days_since_ath
-            
-            bb_10 = BollingerBands(df['close'], window = 10, window_dev = 1.5)
-            bb_20 = BollingerBands(df['close'], window = 20, window_dev = 2)
-            bb_50 = BollingerBands(df['close'], window = 50, window_dev = 2.5)
-
-            rsi_data.append({"symbol": symbol, "RSI": df['RSI'].iloc[-2]})
-            
-            sma_rsi = self.calculate_sma(df['RSI'], 14)
-            sma_7 = self.calculate_sma(df['close'], 7)
-            sma_10 = self.calculate_sma(df['close'], 10)
-            sma_20 = self.calculate_sma(df['close'], 20)
-            sma_50 = self.calculate_sma(df['close'], 50)
-            sma_200 = self.calculate_sma(df['close'], 200)
-            sma_100 = self.calculate_sma(df['close'], 100)
-            flag_7 = self.check_trend(sma_7.iloc[-2], sma_7.iloc[-3])
-            flag_20 = self.check_trend(sma_20.iloc[-2], sma_20.iloc[-3])
-            flag_50 = self.check_trend(sma_50.iloc[-2], sma_50.iloc[-3])
-            flag_100 = self.check_trend(sma_100.iloc[-2], sma_100.iloc[-3])
-            flag_200 = self.check_trend(sma_200.iloc[-2], sma_200.iloc[-3])
-            flag_S_7 = self.check_trend_S(sma_7.iloc[-2], sma_7.iloc[-3])
-            flag_S_20 = self.check_trend_S(sma_20.iloc[-2], sma_20.iloc[-3])
-            flag_S_50 = self.check_trend_S(sma_50.iloc[-2], sma_50.iloc[-3])
-            flag_S_100 = self.check_trend_S(sma_100.iloc[-2], sma_100.iloc[-3])
-            flag_S_200 = self.check_trend_S(sma_200.iloc[-2], sma_200.iloc[-3])
-            upper_10 = bb_10.bollinger_hband()
-            lower_10 = bb_10.bollinger_lband()
-            upper_20 = bb_20.bollinger_hband()
-            lower_20 = bb_20.bollinger_lband()
-            upper_50 = bb_50.bollinger_hband()
-            lower_50 = bb_50.bollinger_lband()
-            flag_10bb_Asup = df['close'].iloc[-2] > upper_10.iloc[-2]
-            flag_10bb_inf =  df['close'].iloc[-2]  < sma_10.iloc[-2] 
-            flag_10bb_Ainf = df['close'].iloc[-2] < lower_10.iloc[-2]
-            flag_20bb_Bsup = df['close'].iloc[-2] > sma_20.iloc[-2]  and df['close'].iloc[-2] < upper_20.iloc[-2]
-            flag_20bb_inf = df['close'].iloc[-2]  < sma_20.iloc[-2] 
-            flag_20bb_Ainf = df['close'].iloc[-2] < lower_20.iloc[-2]
-            flag_50bb_sup = df['close'].iloc[-2]  > sma_50.iloc[-2]
-            flag_50bb_Ainf = df['close'].iloc[-2] < lower_50.iloc[-2]
-            flag_dir_mas = sma_50.iloc[-2] > sma_100.iloc[-2] and sma_100.iloc[-2] > sma_200.iloc[-2]
-            flag_dir_S_mas = sma_50.iloc[-2] < sma_100.iloc[-2] and sma_100.iloc[-2] < sma_200.iloc[-2]
-            diff_ath = (df['close'].iloc[-2] - max_high) / max_high
-
-            # Volume based indicators
-            vol_sma_7 = self.calculate_sma(df['volume'], 7)
-            vol_sma_14 = self.calculate_sma(df['volume'], 14)
-            vol_sma_20 = self.calculate_sma(df['volume'], 20)
-
-            df['Volume_SMA7'] = vol_sma_7
-            df['Volume_SMA14'] = vol_sma_14
-            df['Volume_SMA20'] = vol_sma_20
-
-            for periodo in [7, 14, 20]:
-                df[f'Vol%_{periodo}'] = df['volume'] / df[f'Volume_SMA{periodo}']
-
-            for periodo in [30, 90, 150]:
-                df[f'Close%_{periodo}d'] = self.calculate_close_percentage(df['close'], periodo)
-
-            volume_flag = all(df[f'Vol%_{p}'].iloc[-2] > 1 for p in [7, 14, 20])
-            
-            symbol_data[symbol] = {
-                "RSI": df['RSI'].iloc[-2],
-                "Diff_ATH%": df['Diff_ATH%'].iloc[-2],
-                "Days_Since_ATH": days_since_ath,
-                "SMA_RSI": sma_rsi.iloc[-2] if not pd.isna(sma_rsi.iloc[-2]) else float('inf'),
-                "SMA_7": flag_7,
-                "SMA_20": flag_20,
-                "SMA_50": flag_50,
-                "SMA_100": flag_100,
-                "SMA_200": flag_200,
-                "SMA_S_7": flag_S_7,
-                "SMA_S_20": flag_S_20,
-                "SMA_S_50": flag_S_50,
-                "SMA_S_100": flag_S_100,
-                "SMA_S_200": flag_S_200,
-                "DIR_MAS": flag_dir_mas,
-                "DIR_S_MAS": flag_dir_S_mas,
-                "BB10_TOP": flag_10bb_Asup,
-                "BB10_INF": flag_10bb_inf,
-                "BB10_BOT": flag_10bb_Ainf,
-                "BB20_BSUP": flag_20bb_Bsup,
-                "BB20_INF": flag_20bb_inf,
-                "BB20_BOT": flag_20bb_Ainf,
-                "BB50_SUP": flag_50bb_sup,
-                "BB50_BOT": flag_50bb_Ainf,
-                "Vol%_7": df['Vol%_7'].iloc[-2],
-                "Vol%_14": df['Vol%_14'].iloc[-2],
-                "Vol%_20": df['Vol%_20'].iloc[-2],
-                "VOLUME_FLAG": volume_flag,
-                "Close%_30d": df['Close%_30d'].iloc[-2],
-                "Close%_90d": df['Close%_90d'].iloc[-2],
-                "Close%_150d": df['Close%_150d'].iloc[-2],
-                "Close": df['res'].iloc[-2]
-            }
-            print(symbol, symbol_data[symbol]['RSI'])
-         
+        frames = {}
+        ath_info = {}
+        self.load_historical_highs()
+
+        # Cada símbolo é validado e tem o ATH atualizado assim que seus klines chegam;
+        # os indicadores são calculados depois, para todos de uma vez
+        for symbol, df in self.fetch_klines(filtered_symbols, '1d', limit=205):
+            if df is None or len(df) < 15:
+                print(f"Symbol {symbol} possui menos de 15 klines. Ignorando.")
+                continue
+            frames[symbol] = df
+            ath_info[symbol] = self.update_symbol_ath(symbol, df)
+
+        # Mantém a ordem da lista da Binance, independente da ordem de chegada
+        frames = {symbol: frames[symbol] for symbol in filtered_symbols if symbol in frames}
+        self.features = self.build_features(frames, ath_info) if frames else empty_features()
+        # Só a tabela retornada é reduzida para float32; os setups usam self.features
+        features = compact_features(self.features)
+        for symbol, rsi in features['RSI'].items():
+            print(symbol, rsi)
+
+        self.flush_historical_highs()
         print("Final RSI Data:")
-        '''for symbol, data in symbol_data.items():
-            print(f"Symbol: {symbol}, Last RSI: {data['RSI']:.2f}")
-        ''' 
         
-        return rsi_data, symbol_data
+        return features
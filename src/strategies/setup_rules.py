@@ -0,0 +1,85 @@
+import json
+import os
+import numpy as np
+
+RULES_FILE = os.path.join(os.path.dirname(__file__), "../configs/setup_rules.json")
+
+OPERATORS = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+
+class SetupRules:
+    """
+    Setups (L_15_ST1 ... D1_B3) definidos em JSON e compilados em máscaras booleanas.
+    Cada regra tem condições [campo, operador, valor] combinadas com AND em "all",
+    grupos opcionais em "any" (OR de grupos AND) e um escopo opcional "top": só os
+    N maiores RSIs. Os símbolos são ordenados por RSI uma vez e todas as listas saem
+    de uma única passada vetorizada, na ordem de RSI decrescente.
+    """
+
+    def __init__(self, rules_file=RULES_FILE):
+        with open(rules_file, "r") as file:
+            self.rules = json.load(file)
+        self.compiled = {name: self.compile_rule(name, rule) for name, rule in self.rules.items()}
+
+    def compile_condition(self, name, condition):
+        field, operator, value = condition
+        if operator not in OPERATORS:
+            raise ValueError(f"Setup {name}: operador inválido '{operator}'.")
+        compare = OPERATORS[operator]
+        return lambda columns: compare(columns[field], value)
+
+    def compile_rule(self, name, rule):
+        """Retorna (top, função que recebe {campo: array} e devolve a máscara da regra)."""
+        conditions = [self.compile_condition(name, condition) for condition in rule.get("all", [])]
+        groups = [[self.compile_condition(name, condition) for condition in group] for group in rule.get("any", [])]
+
+        def mask(columns, size):
+            result = np.ones(size, dtype=bool)
+            for condition in conditions:
+                result &= condition(columns)
+            if groups:
+                result &= np.logical_or.reduce([
+                    np.logical_and.reduce([condition(columns) for condition in group]) for group in groups
+                ])
+            return result
+
+        return rule.get("top"), mask
+
+    def derived_fields(self, columns, size):
+        """Campos calculados usados pelas regras além dos de symbol_data."""
+        columns["RSI_SMA_RSI_DIFF"] = columns["RSI"] - columns["SMA_RSI"]
+        if "RSI_Rank" in columns:
+            columns["RSI_QUARTIL"] = columns["RSI_Rank"] / size
+        if "RSI_Rank_ASC" in columns:
+            columns["RSI_QUARTIL_ASC"] = columns["RSI_Rank_ASC"] / size
+        return columns
+
+    def evaluate(self, features):
+        """
+        `features`: DataFrame indexado por símbolo com os campos de symbol_data.
+        Retorna {setup: [símbolos]} na ordem das regras.
+        """
+        size = len(features)
+        # Ordem estável por RSI decrescente, como sorted(..., reverse=True)
+        order = np.argsort(-features["RSI"].to_numpy(dtype=float), kind="stable")
+        symbols = features.index.to_numpy()[order]
+        columns = {
+            column: features[column].to_numpy(dtype=float)[order]
+            for column in features.columns
+        }
+        columns = self.derived_fields(columns, size)
+        position = np.arange(size)
+
+        listas = {}
+        for name, (top, mask) in self.compiled.items():
+            selected = mask(columns, size)
+            if top is not None:
+                selected &= position < top
+            listas[name] = symbols[selected].tolist()
+        return listas
@@ -0,0 +1,122 @@
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import requests
+from src.strategies.ath_backfill import AthBackfill
+
+DAY_MS = 86400000
+START_MS = 1704067200000  # 2024-01-01 UTC
+
+
+class StubResponse:
+    def __init__(self, status_code, data=None, headers=None):
+        self.status_code = status_code
+        self.data = data
+        self.headers = headers or {}
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code}", response=self)
+
+
+class StubSession:
+    def __init__(self, handler):
+        self.handler = handler
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        path = url.replace(AthBackfill.BASE_URL, "")
+        self.calls.append((path, dict(params or {})))
+        return self.handler(path, params or {})
+
+
+class StubLimiter:
+    def __init__(self):
+        self.pauses = []
+
+    def acquire(self, tokens=1):
+        pass
+
+    def pause(self, seconds):
+        self.pauses.append(seconds)
+
+
+def kline(day, high):
+    open_time = START_MS + day * DAY_MS
+    return [open_time, "1", str(high), "1", "1", "1", open_time + DAY_MS - 1, "0", 1, "0", "0", "0"]
+
+
+class AthBackfillTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "historical_high.db")
+        self.checkpoint_file = os.path.join(self.tmp_dir.name, "checkpoint.json")
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE historical_high (symbol TEXT PRIMARY KEY, max_high REAL, ath_date TEXT, updated_at TEXT)")
+        conn.close()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def backfill(self, handler):
+        backfill = AthBackfill(db_path=self.db_path, checkpoint_file=self.checkpoint_file, max_workers=2)
+        backfill.session = StubSession(handler)
+        backfill.rate_limiter = StubLimiter()
+        return backfill
+
+    def test_run_skips_bad_symbols_per_symbol(self):
+        klines = {
+            "AAAUSDT": [kline(0, 10), kline(1, 30), kline(2, 20)],
+            "BBBUSDT": [],  # Listado, mas sem candles fechados
+            "CCCUSDT": [["bad"]],  # Resposta inválida
+        }
+
+        def handler(path, params):
+            if path == "/exchangeInfo":
+                return StubResponse(200, {"symbols": [
+                    {"symbol": symbol, "contractType": "PERPETUAL", "onboardDate": START_MS} for symbol in klines
+                ]})
+            return StubResponse(200, klines[params["symbol"]])
+
+        highs = self.backfill(handler).run()
+        self.assertEqual(highs, {"AAAUSDT": {"max_high": 30.0, "ath_date": "2024-01-02"}})
+        rows = sqlite3.connect(self.db_path).execute("SELECT symbol, max_high, ath_date FROM historical_high").fetchall()
+        self.assertEqual(rows, [("AAAUSDT", 30.0, "2024-01-02")])
+        # Todos concluídos (inclusive os pulados): o checkpoint é removido
+        self.assertFalse(os.path.exists(self.checkpoint_file))
+
+    def test_network_error_stays_pending(self):
+        def handler(path, params):
+            if path == "/exchangeInfo":
+                return StubResponse(200, {"symbols": [
+                    {"symbol": symbol, "contractType": "PERPETUAL"} for symbol in ("AAAUSDT", "BBBUSDT")
+                ]})
+            if params["symbol"] == "BBBUSDT":
+                raise requests.exceptions.ConnectionError("connection reset")
+            return StubResponse(200, [])
+
+        self.backfill(handler).run()
+        with open(self.checkpoint_file) as file:
+            checkpoint = json.load(file)
+        self.assertEqual(checkpoint, {"AAAUSDT": {"max_high": None, "ath_date": None, "skipped": "no closed klines"}})
+
+    def test_get_retries_then_raises(self):
+        backfill = self.backfill(lambda path, params: StubResponse(429, headers={"Retry-After": "3"}))
+        with self.assertRaises(requests.exceptions.HTTPError):
+            backfill._get("/klines", {"symbol": "AAAUSDT"}, max_retries=2)
+        self.assertEqual(len(backfill.session.calls), 3)
+        self.assertEqual(backfill.rate_limiter.pauses, [3.0, 3.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.services.database import DatabaseManager
+
+
+def trade(trade_id, symbol, side, quantity, price, time):
+    return {
+        'trade_id': trade_id, 'symbol': symbol, 'side': side,
+        'quantity': quantity, 'price': price, 'quoteQty': quantity * price, 'time': time
+    }
+
+
+TRADES = [
+    trade('1', 'AAAUSDT', 'BUY', 10, 2.0, 1000),
+    trade('2', 'AAAUSDT', 'BUY', 5, 4.0, 2000),
+    trade('3', 'AAAUSDT', 'SELL', 8, 5.0, 3000),
+    trade('4', 'BBBUSDT', 'BUY', 1, 100.0, 1500),
+]
+
+
+class DatabaseManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "trades.db")
+        self.db = DatabaseManager(self.db_path)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp_dir.cleanup()
+
+    def summary(self):
+        return {row[0]: row[1:] for row in self.db.get_summary()}
+
+    def assertSummary(self, expected):
+        summary = self.summary()
+        self.assertEqual(sorted(summary), sorted(expected))
+        for symbol, values in expected.items():
+            for actual, value in zip(summary[symbol], values):
+                self.assertAlmostEqual(actual, value)
+
+    def test_summary_maintained_by_triggers(self):
+        self.db.save_to_sqlite(TRADES)
+        # total_result, total_buys, avg_quantity, avg_price (mesmas fórmulas da view original sobre trades)
+        self.assertSummary({
+            'AAAUSDT': (10 * 2.0 + 5 * 4.0 - 8 * 5.0, 2, 23 / 3, 11.0 / 3),
+            'BBBUSDT': (100.0, 1, 1.0, 100.0),
+        })
+
+        conn = self.db.connect()
+        with conn:
+            conn.execute("DELETE FROM trades WHERE trade_id = '3'")
+            conn.execute("DELETE FROM trades WHERE trade_id = '4'")
+        self.assertSummary({'AAAUSDT': (40.0, 2, 7.5, 3.0)})
+
+    def test_summary_matches_aggregation_over_trades(self):
+        self.db.save_to_sqlite(TRADES)
+        expected = self.db.connect().execute('''
+            SELECT symbol,
+                   SUM(CASE WHEN side = 'BUY' THEN price * quantity ELSE -price * quantity END),
+                   COUNT(CASE WHEN side = 'BUY' THEN 1 ELSE NULL END),
+                   SUM(quantity) / COUNT(*),
+                   AVG(price)
+            FROM trades GROUP BY symbol
+        ''').fetchall()
+        self.assertSummary({row[0]: row[1:] for row in expected})
+
+    def test_duplicate_trade_ids_are_ignored(self):
+        self.assertEqual(self.db.save_to_sqlite(TRADES[:2]), 2)
+        # A fronteira da página é buscada de novo na sincronização: só a trade nova entra
+        self.assertEqual(self.db.save_to_sqlite(TRADES[1:3]), 1)
+        self.assertEqual(self.db.save_to_sqlite(TRADES[:3]), 0)
+
+        count = self.db.connect().execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+        self.assertEqual(count, 3)
+        # Trades ignoradas não passam pelo trigger
+        self.assertSummary({'AAAUSDT': (0.0, 2, 23 / 3, 11.0 / 3)})
+
+    def test_get_summary_is_read_only(self):
+        self.db.save_to_sqlite(TRADES)
+        conn = self.db.connect()
+        changes = conn.total_changes
+        self.db.get_summary()
+        self.db.get_summary('AAAUSDT')
+        self.assertEqual(conn.total_changes, changes)
+        self.assertFalse(conn.in_transaction)
+
+    def test_existing_database_is_migrated(self):
+        # Banco antigo: sem trade_id, sem symbol_summary e com a view sobre trades
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''
+            CREATE TABLE trades (
+                id INTEGER PRIMARY KEY, symbol TEXT, side TEXT, quantity REAL,
+                price REAL, quoteQty REAL, time INTEGER
+            )
+        ''')
+        conn.execute("INSERT INTO trades (symbol, side, quantity, price, quoteQty, time) VALUES ('AAAUSDT', 'BUY', 10, 2.0, 20.0, 1000)")
+        conn.execute("CREATE VIEW aggregated_results AS SELECT symbol, COUNT(*) AS trades FROM trades GROUP BY symbol")
+        conn.commit()
+        conn.close()
+
+        self.db.save_to_sqlite(TRADES[1:3])
+        self.assertSummary({'AAAUSDT': (0.0, 2, 23 / 3, 11.0 / 3)})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+from src.strategies.kline_store import KLINE_DTYPE, KlineStore
+from src.strategies.indicator_panel import IndicatorPanel
+from src.strategies.indicator_state import HISTORY, StreamingIndicators
+
+DAY_MS = 86400000
+# Símbolo com histórico maior que HISTORY, um com quase HISTORY e um curto (sem SMA_200)
+SYMBOL_DAYS = {"AAAUSDT": 260, "BBBUSDT": 203, "CCCUSDT": 120}
+NEW_DAYS = 5
+
+
+def random_klines(days, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, days)))
+    open_ = np.concatenate([[100.0], close[:-1]]) * (1 + rng.normal(0, 0.002, days))
+    records = np.empty(days, dtype=KLINE_DTYPE)
+    records['timestamp'] = 1600000000000 + np.arange(days) * DAY_MS
+    records['open'] = open_
+    records['high'] = np.maximum(open_, close) * (1 + rng.uniform(0, 0.02, days))
+    records['low'] = np.minimum(open_, close) * (1 - rng.uniform(0, 0.02, days))
+    records['close'] = close
+    records['volume'] = rng.lognormal(10, 0.5, days)
+    return records
+
+
+class StreamingIndicatorsTest(unittest.TestCase):
+    """O estado incremental tem que dar os mesmos campos que o recálculo completo do IndicatorPanel."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = KlineStore(os.path.join(self.tmp_dir.name, "klines"))
+        self.db_path = os.path.join(self.tmp_dir.name, "indicator_state.db")
+        self.history = {
+            symbol: random_klines(days + NEW_DAYS, seed)
+            for seed, (symbol, days) in enumerate(SYMBOL_DAYS.items())
+        }
+        self.symbols = list(SYMBOL_DAYS)
+        self.max_high = np.array([self.history[symbol]['high'].max() for symbol in self.symbols])
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def store_until(self, day):
+        """Grava os klines até `day` dias além do histórico inicial; o último é o candle aberto."""
+        for symbol, days in SYMBOL_DAYS.items():
+            records = self.history[symbol][:days + day]
+            stored = self.store.count(symbol)
+            # Como na análise: o último candle salvo é buscado de novo e substituído
+            self.store.append(symbol, records[max(stored - 1, 0):])
+
+    def full_recompute(self):
+        frames = {symbol: self.store.to_dataframe(self.store.load(symbol, HISTORY)) for symbol in self.symbols}
+        return IndicatorPanel(frames).last_closed(self.max_high)
+
+    def assertFeatures(self, actual, expected, rsi_rtol):
+        self.assertEqual(sorted(actual), sorted(expected))
+        for name, values in expected.items():
+            with self.subTest(field=name):
+                if values.dtype == bool:
+                    np.testing.assert_array_equal(actual[name], values)
+                else:
+                    rtol = rsi_rtol if name in ("RSI", "SMA_RSI") else 1e-9
+                    np.testing.assert_allclose(actual[name], values, rtol=rtol)
+
+    def test_build_matches_full_recompute(self):
+        self.store_until(0)
+        features = StreamingIndicators(self.store, db_path=self.db_path).run(self.symbols, self.max_high)
+        self.assertFeatures(features, self.full_recompute(), rsi_rtol=1e-9)
+
+    def test_daily_updates_match_full_recompute(self):
+        self.store_until(0)
+        StreamingIndicators(self.store, db_path=self.db_path).run(self.symbols, self.max_high)
+
+        for day in range(1, NEW_DAYS + 1):
+            self.store_until(day)
+            # Uma instância nova por dia: o estado vem do SQLite, como entre execuções do main()
+            streaming = StreamingIndicators(self.store, db_path=self.db_path)
+            saved = streaming.load()
+            features = streaming.run(self.symbols, self.max_high)
+            with self.subTest(day=day):
+                # O RSI de Wilder guarda o histórico anterior à janela de HISTORY candles do painel
+                self.assertFeatures(features, self.full_recompute(), rsi_rtol=1e-5)
+                for symbol in self.symbols:
+                    state = streaming.load()[symbol]
+                    self.assertEqual(state['since_build'], saved[symbol]['since_build'] + 1)
+                    self.assertEqual(state['last_ts'], int(self.store.load(symbol)['timestamp'][-2]))
+
+    def test_short_history_has_no_drift(self):
+        self.store_until(0)
+        StreamingIndicators(self.store, db_path=self.db_path).run(self.symbols, self.max_high)
+        self.store_until(NEW_DAYS)
+        features = StreamingIndicators(self.store, db_path=self.db_path).run(self.symbols, self.max_high)
+        expected = self.full_recompute()
+        # CCCUSDT tem menos de HISTORY candles: o painel vê o mesmo histórico que o estado
+        short = self.symbols.index("CCCUSDT")
+        np.testing.assert_allclose(features["RSI"][short], expected["RSI"][short], rtol=1e-9)
+        self.assertFalse(np.isnan(features["Vol%_20"]).any())
+        self.assertFalse(features["SMA_200"][short])
+
+
+if __name__ == "__main__":
+    unittest.main()
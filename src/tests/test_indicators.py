@@ -0,0 +1,117 @@
+import json
+import os
+import sys
+import unittest
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+from src.strategies import indicators
+from src.strategies.indicator_panel import close_percentage_at
+
+# Valores gerados com btalib (rsi, smma), ta.volatility.BollingerBands e pandas rolling
+GOLDEN_FILE = os.path.join(os.path.dirname(__file__), "data/indicators_golden.json")
+
+
+def load_golden():
+    with open(GOLDEN_FILE, "r") as file:
+        return json.load(file)
+
+
+class IndicatorsGoldenTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.golden = load_golden()
+
+    def assertSeries(self, actual, expected):
+        expected = np.array([np.nan if value is None else value for value in expected])
+        np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+        np.testing.assert_allclose(actual[~np.isnan(actual)], expected[~np.isnan(expected)], rtol=1e-9, atol=1e-8)
+
+    def assertIndicator(self, actual, expected):
+        if isinstance(expected, dict):
+            for band, values in zip(("middle", "upper", "lower"), actual):
+                self.assertSeries(values, expected[band])
+        else:
+            self.assertSeries(actual, expected)
+
+    @staticmethod
+    def compute(close, key):
+        if key.startswith("rsi_"):
+            return indicators.rsi(close, int(key.split("_")[1]))
+        if key.startswith("smma_"):
+            return indicators.rma(close, int(key.split("_")[1]))
+        if key.startswith("sma_"):
+            return indicators.sma(close, int(key.split("_")[1]))
+        if key == "std_20_ddof1":
+            return indicators.rolling_std(close, 20, ddof=1)
+        window = int(key.split("_")[1])
+        return indicators.bollinger(close, window, {10: 1.5, 20: 2, 50: 2.5}[window])
+
+    def test_1d_matches_golden(self):
+        for name in ("close", "short_close"):
+            close = np.array(self.golden[name])
+            for key, expected in self.golden[f"expected_{name}"].items():
+                with self.subTest(series=name, indicator=key):
+                    self.assertIndicator(self.compute(close, key), expected)
+
+    def test_2d_rows_match_golden(self):
+        """Painel alinhado à direita: a série curta é completada com NaN à esquerda."""
+        close = np.array(self.golden["close"])
+        short = np.array(self.golden["short_close"])
+        offset = len(close) - len(short)
+        panel = np.full((2, len(close)), np.nan)
+        panel[0] = close
+        panel[1, offset:] = short
+
+        for key in self.golden["expected_close"]:
+            with self.subTest(indicator=key):
+                result = self.compute(panel, key)
+                bands = result if isinstance(result, tuple) else None
+                first = tuple(band[0] for band in bands) if bands else result[0]
+                second = tuple(band[1, offset:] for band in bands) if bands else result[1, offset:]
+                self.assertIndicator(first, self.golden["expected_close"][key])
+                self.assertIndicator(second, self.golden["expected_short_close"][key])
+                if bands is None:
+                    self.assertTrue(np.isnan(result[1, :offset]).all())
+
+    def test_rsi_averages_match_rma_of_gains(self):
+        close = np.array(self.golden["close"])
+        avg_gain, avg_loss = indicators.rsi_averages(close, 14)
+        rsi = indicators.rsi_from_averages(avg_gain, avg_loss)
+        self.assertSeries(rsi, self.golden["expected_close"]["rsi_14"])
+
+    @staticmethod
+    def close_percentage_loop(series, window):
+        """Implementação original (loop por candle) de RSIAnalyzer.calculate_close_percentage."""
+        result = []
+        for i in range(len(series)):
+            past_window = series[:i] if i < window else series[i - window:i]
+            result.append(round((past_window < series[i]).sum() / window, 4))
+        return np.array(result)
+
+    def test_close_percentage_matches_loop(self):
+        close = np.array(self.golden["close"])
+        short = np.array(self.golden["short_close"])
+        offset = len(close) - len(short)
+        panel = np.full((2, len(close)), np.nan)
+        panel[0] = close
+        panel[1, offset:] = short
+        for window in (30, 90, 150):
+            with self.subTest(window=window):
+                expected = self.close_percentage_loop(close, window)
+                np.testing.assert_array_equal(indicators.close_percentage(close, window), expected)
+                result = indicators.close_percentage(panel, window)
+                np.testing.assert_array_equal(result[0], expected)
+                np.testing.assert_array_equal(result[1, offset:], self.close_percentage_loop(short, window))
+                np.testing.assert_array_equal(close_percentage_at(panel, window), result[:, -2])
+
+    def test_short_history_is_nan(self):
+        close = np.array(self.golden["close"][:10])
+        self.assertTrue(np.isnan(indicators.rsi(close, 14)).all())
+        self.assertTrue(np.isnan(indicators.sma(close, 20)).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
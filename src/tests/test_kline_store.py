@@ -0,0 +1,81 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+import pandas as pd
+from src.strategies.kline_store import KLINE_DTYPE, KlineStore
+
+DAY_MS = 86400000
+START_MS = 1704067200000  # 2024-01-01 UTC
+
+
+def klines(days, start_day=0, close_offset=0.0):
+    records = np.empty(days, dtype=KLINE_DTYPE)
+    index = np.arange(start_day, start_day + days)
+    records['timestamp'] = START_MS + index * DAY_MS
+    records['open'] = 100 + index
+    records['high'] = 110 + index
+    records['low'] = 90 + index
+    records['close'] = 105 + index + close_offset
+    records['volume'] = 1000 * (index + 1)
+    return records
+
+
+class KlineStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = KlineStore(os.path.join(self.tmp_dir.name, "klines"))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_empty_symbol(self):
+        self.assertEqual(self.store.count("BTCUSDT"), 0)
+        self.assertEqual(len(self.store.load("BTCUSDT")), 0)
+        self.assertIsNone(self.store.last_timestamp("BTCUSDT"))
+
+    def test_append_replace_last_and_load(self):
+        first = klines(5)
+        self.store.append("BTCUSDT", first)
+        np.testing.assert_array_equal(self.store.load("BTCUSDT"), first)
+
+        # Nova execução: o último candle (ainda aberto) volta com outro close e chega um dia novo
+        update = klines(2, start_day=4, close_offset=2.5)
+        self.store.append("BTCUSDT", update)
+
+        loaded = self.store.load("BTCUSDT")
+        self.assertEqual(self.store.count("BTCUSDT"), 6)
+        np.testing.assert_array_equal(loaded[:4], first[:4])
+        np.testing.assert_array_equal(loaded[4:], update)
+        self.assertEqual(loaded['close'][4], 109 + 2.5)
+        self.assertEqual(self.store.last_timestamp("BTCUSDT"), START_MS + 5 * DAY_MS)
+        np.testing.assert_array_equal(self.store.load("BTCUSDT", limit=2), update)
+
+    def test_symbols_are_separate_files(self):
+        self.store.append("BTCUSDT", klines(3))
+        self.store.append("ETHUSDT", klines(2, close_offset=1.0))
+        self.assertEqual(self.store.count("BTCUSDT"), 3)
+        self.assertEqual(self.store.count("ETHUSDT"), 2)
+        self.assertEqual(self.store.load("ETHUSDT")['close'][0], 106.0)
+
+    def test_dataframe_round_trip(self):
+        records = klines(3)
+        df = self.store.to_dataframe(records)
+        self.assertEqual(df.index[0], pd.Timestamp("2024-01-01"))
+        self.assertEqual(list(df.columns), ['open', 'high', 'low', 'close', 'volume'])
+
+        # Índice ou coluna datetime (como no DataFrame de get_klines) voltam para ms
+        np.testing.assert_array_equal(self.store.from_dataframe(df), records)
+        np.testing.assert_array_equal(self.store.from_dataframe(df.reset_index()), records)
+
+        self.store.append("BTCUSDT", self.store.from_dataframe(df))
+        pd.testing.assert_frame_equal(self.store.to_dataframe(self.store.load("BTCUSDT")), df)
+
+
+if __name__ == "__main__":
+    unittest.main()
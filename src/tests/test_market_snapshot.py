@@ -0,0 +1,83 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.services.market_snapshot import TieredMarketRefresher
+
+
+class StubCoinGecko:
+    """Uma moeda por página: a moeda da página N tem id "coin-N" e rank N."""
+
+    def __init__(self, max_pages):
+        self.max_pages = max_pages
+        self.requested = []
+
+    def iter_market_pages(self, pages):
+        self.requested.append(list(pages))
+        for page in pages:
+            if page > self.max_pages:
+                return
+            yield [{
+                'id': f"coin-{page}", 'name': f"Coin {page}", 'symbol': f"c{page}",
+                'market_cap_rank': page, 'ath_change_percentage': -10.0,
+                'ath_date': "2024-01-01T00:00:00Z", 'total_volume': 1e6,
+            }]
+
+
+class TieredMarketRefresherTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.coingecko = StubCoinGecko(max_pages=10)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def refresher(self):
+        # 2 páginas do topo e cauda de 8 páginas, 3 por execução: rotação de 3 execuções
+        return TieredMarketRefresher(
+            self.coingecko, db_path=os.path.join(self.tmp_dir.name, "snapshot.db"),
+            top_pages=2, tail_pages_per_run=3, max_pages=10
+        )
+
+    def test_rotation_covers_tail(self):
+        refresher = self.refresher()
+        self.assertEqual(refresher.rotation_runs(), 3)
+        for _ in range(4):
+            refresher.refresh()
+        self.assertEqual(self.coingecko.requested, [
+            [1, 2, 3, 4, 5], [1, 2, 6, 7, 8], [1, 2, 9, 10, 3], [1, 2, 4, 5, 6],
+        ])
+
+    def test_recent_rows_keep_last_rotation(self):
+        refresher = self.refresher()
+        for _ in range(3):
+            snapshot = refresher.refresh()
+        # Após uma rotação completa todas as moedas são recentes, não só as desta execução
+        self.assertEqual(len(refresher.fresh_rows(snapshot)), 5)
+        self.assertEqual(sorted(refresher.recent_rows(snapshot)['market_cap_rank']), list(range(1, 11)))
+
+        # Moeda que sumiu da API deixa de ser atualizada e sai depois de uma rotação
+        # (mais uma execução, porque a rotação recomeça quando a cauda acaba antes)
+        self.coingecko.max_pages = 9
+        for _ in range(4):
+            snapshot = refresher.refresh()
+        self.assertIn(10, snapshot['market_cap_rank'].tolist())
+        self.assertEqual(sorted(refresher.recent_rows(snapshot)['market_cap_rank']), list(range(1, 10)))
+
+    def test_recent_rows_state_is_persistent(self):
+        for _ in range(3):
+            self.refresher().refresh()
+        # Nova instância (nova execução do main) sem refresh: a rotação vem do SQLite
+        refresher = self.refresher()
+        snapshot = refresher.load_snapshot()
+        self.assertEqual(len(refresher.recent_rows(snapshot)), 10)
+        self.assertEqual(len(refresher.recent_rows(snapshot, max_staleness=-1)), 0)
+        self.assertEqual(str(snapshot['market_cap_rank'].dtype), "Int64")
+
+
+if __name__ == "__main__":
+    unittest.main()
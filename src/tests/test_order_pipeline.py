@@ -0,0 +1,252 @@
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from urllib.parse import parse_qs, urlparse
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import requests
+from src.services.api_mexc import MexcAPI
+from src.services.order_pipeline import OrderPipeline
+
+
+class StubResponse:
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self.data = data
+        self.text = json.dumps(data)
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code}", response=self)
+
+
+class StubSession:
+    """Sessão falsa: `handler(method, path, params)` devolve um StubResponse ou levanta uma exceção."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.headers = {}
+        self.calls = []
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def _call(self, method, url, query):
+        parsed = urlparse(url)
+        path = parsed.path.replace("/api/v3", "")
+        params = {key: values[0] for key, values in parse_qs(query or parsed.query).items()}
+        self.calls.append((method, path, params))
+        return self.handler(method, path, params)
+
+    def get(self, url, params=None, timeout=None):
+        if params:
+            return self._call("GET", url, "&".join(f"{key}={value}" for key, value in params.items()))
+        return self._call("GET", url, None)
+
+    def request(self, method, url, data=None, timeout=None, headers=None):
+        return self._call(method, url, data)
+
+
+def make_mexc(handler):
+    mexc = MexcAPI("key", "secret", exchange_info_cache=None)
+    mexc.session = StubSession(handler)
+    mexc.exchange_info = {f"{symbol}USDT": {"baseAssetPrecision": 2, "quoteAssetPrecision": 4, "filters": []}
+                          for symbol in ("AAA", "BBB", "CCC")}
+    mexc.exchange_info_fetched_at = float("inf")
+    return mexc
+
+
+def order(symbol, client_order_id, price=1.0, quantity=10):
+    return {"symbol": symbol, "price": price, "quantity": quantity, "side": "BUY", "client_order_id": client_order_id}
+
+
+class BaseHandler:
+    """Exchange falsa: guarda as ordens aceitas por client order id."""
+
+    def __init__(self):
+        self.accepted = {}
+        self.reject = set()
+        self.fail_batch = False
+        self.fail_order_once = set()
+        self.next_id = 1
+
+    def accept(self, client_order_id):
+        if client_order_id in self.reject:
+            return {"code": 30004, "msg": "Insufficient position"}
+        self.accepted[client_order_id] = {"orderId": str(self.next_id), "clientOrderId": client_order_id}
+        self.next_id += 1
+        return self.accepted[client_order_id]
+
+    def __call__(self, method, path, params):
+        if path == "/time":
+            return StubResponse(200, {"serverTime": 0})
+        if path == "/klines":
+            return StubResponse(200, [[0, {"AAAUSDT": "2", "BBBUSDT": "4", "CCCUSDT": "5"}[params["symbol"]]]])
+        if path == "/batchOrders":
+            items = json.loads(params["batchOrders"])
+            for item in items:
+                self.accept(item["newClientOrderId"])
+            if self.fail_batch:
+                raise requests.exceptions.ConnectionError("connection reset")
+            return StubResponse(200, [self.accept(item["newClientOrderId"]) if item["newClientOrderId"] in self.reject
+                                      else self.accepted[item["newClientOrderId"]] for item in items])
+        if path == "/order" and method == "POST":
+            client_order_id = params["newClientOrderId"]
+            if client_order_id in self.accepted:
+                return StubResponse(400, {"code": 30008, "msg": "Duplicate client order id"})
+            response = self.accept(client_order_id)
+            if client_order_id in self.fail_order_once:
+                self.fail_order_once.discard(client_order_id)
+                raise requests.exceptions.ReadTimeout("read timeout")
+            return StubResponse(200 if "orderId" in response else 400, response)
+        if path == "/order" and method == "GET":
+            found = self.accepted.get(params["origClientOrderId"])
+            if found is None:
+                return StubResponse(400, {"code": -2013, "msg": "Order does not exist."})
+            return StubResponse(200, found)
+        raise AssertionError(f"Unexpected call {method} {path}")
+
+
+def posts(session, path):
+    return [call for call in session.calls if call[0] == "POST" and call[1] == path]
+
+
+class PlaceLimitOrdersTest(unittest.TestCase):
+    def test_results_in_input_order_and_rejected_items_retried(self):
+        handler = BaseHandler()
+        handler.reject.add("b")
+        mexc = make_mexc(handler)
+        results = mexc.place_limit_orders([order("AAA", "a"), order("AAA", "b"), order("AAA", "c")])
+
+        self.assertEqual([result.get("clientOrderId") for result in results], ["a", None, "c"])
+        self.assertEqual(results[1]["code"], 30004)
+        self.assertEqual(len(posts(mexc.session, "/batchOrders")), 1)
+        self.assertEqual(len(posts(mexc.session, "/order")), 1)  # Só o item rejeitado
+
+    def test_chunks_of_batch_order_limit(self):
+        mexc = make_mexc(BaseHandler())
+        mexc.BATCH_ORDER_LIMIT = 2
+        results = mexc.place_limit_orders([order("AAA", client_order_id) for client_order_id in "abc"])
+        self.assertEqual([result["clientOrderId"] for result in results], ["a", "b", "c"])
+        self.assertEqual(len(posts(mexc.session, "/batchOrders")), 2)
+
+    def test_single_symbol_only(self):
+        mexc = make_mexc(BaseHandler())
+        with self.assertRaises(ValueError):
+            mexc.place_limit_orders([order("AAA", "a"), order("BBB", "b")])
+        self.assertEqual(mexc.session.calls, [])
+
+    def test_transport_error_leaves_state_unknown(self):
+        handler = BaseHandler()
+        handler.fail_batch = True
+        mexc = make_mexc(handler)
+        self.assertEqual(mexc.place_limit_orders([order("AAA", "a"), order("AAA", "b")]), [None, None])
+
+
+class OrderPipelineTest(unittest.TestCase):
+    def test_groups_same_symbol_orders_and_keeps_order(self):
+        handler = BaseHandler()
+        mexc = make_mexc(handler)
+        pipeline = OrderPipeline(mexc, max_in_flight=3)
+        candidates = [("AAA", 10, "top"), ("BBB", 20, "top"), ("ZZZ", 10, "top"), ("AAA", 5, "lowcap"), ("CCC", 10, "lowcap")]
+        results = pipeline.execute(candidates, batch=True)
+
+        self.assertEqual([(result["symbol"], result["tag"], result["status"]) for result in results], [
+            ("ZZZ", "top", "NOT_FOUND"),
+            ("AAA", "top", "PLACED"),
+            ("BBB", "top", "PLACED"),
+            ("AAA", "lowcap", "PLACED"),
+            ("CCC", "lowcap", "PLACED"),
+        ])
+        self.assertEqual([result["quantity"] for result in results[1:]], [5.0, 5.0, 2.5, 2.0])
+        # AAA (duas ordens) vai em uma batch; BBB e CCC como ordens individuais
+        batch_calls = posts(mexc.session, "/batchOrders")
+        self.assertEqual(len(batch_calls), 1)
+        self.assertEqual({item["symbol"] for item in json.loads(batch_calls[0][2]["batchOrders"])}, {"AAAUSDT"})
+        self.assertEqual(sorted(call[2]["symbol"] for call in posts(mexc.session, "/order")), ["BBBUSDT", "CCCUSDT"])
+
+    def test_without_batch_every_order_is_single(self):
+        mexc = make_mexc(BaseHandler())
+        results = OrderPipeline(mexc).execute([("AAA", 10, "top"), ("AAA", 5, "lowcap")])
+        self.assertEqual([result["status"] for result in results], ["PLACED", "PLACED"])
+        self.assertEqual(posts(mexc.session, "/batchOrders"), [])
+
+    def test_batch_transport_error_is_reconciled_before_resubmitting(self):
+        handler = BaseHandler()
+        mexc = make_mexc(handler)
+        pipeline = OrderPipeline(mexc)
+        orders = [order("AAA", "a"), order("AAA", "b")]
+
+        # A exchange aceitou só "a" antes da conexão cair
+        def batch_then_fail(method, path, params):
+            if path == "/batchOrders":
+                handler.accept("a")
+                raise requests.exceptions.ConnectionError("connection reset")
+            return BaseHandler.__call__(handler, method, path, params)
+
+        mexc.session.handler = batch_then_fail
+        results = pipeline.submit_batch(orders)
+
+        self.assertEqual([result["status"] for result in results], ["PLACED", "PLACED"])
+        self.assertEqual(results[0]["response"]["orderId"], "1")
+        # "a" foi encontrada pelo client order id; só "b" foi enviada de novo
+        self.assertEqual([call[2]["newClientOrderId"] for call in posts(mexc.session, "/order")], ["b"])
+        self.assertEqual(sorted(handler.accepted), ["a", "b"])
+
+    def test_single_order_retry_does_not_duplicate(self):
+        handler = BaseHandler()
+        handler.fail_order_once.add("a")
+        mexc = make_mexc(handler)
+        result = OrderPipeline(mexc).submit(order("AAA", "a"))
+
+        self.assertEqual(result["status"], "PLACED")
+        self.assertEqual(len(posts(mexc.session, "/order")), 1)
+        self.assertEqual(list(handler.accepted), ["a"])
+
+    def test_unknown_order_is_resubmitted(self):
+        handler = BaseHandler()
+        mexc = make_mexc(handler)
+        calls = {"count": 0}
+
+        def fail_first_post(method, path, params):
+            if path == "/order" and method == "POST" and calls["count"] == 0:
+                calls["count"] += 1
+                raise requests.exceptions.ConnectionError("connection refused")
+            return handler(method, path, params)
+
+        mexc.session.handler = fail_first_post
+        result = OrderPipeline(mexc).submit(order("AAA", "a"))
+        self.assertEqual(result["status"], "PLACED")
+        self.assertEqual(len(posts(mexc.session, "/order")), 2)
+        self.assertEqual(list(handler.accepted), ["a"])
+
+
+class TimeSyncTest(unittest.TestCase):
+    def test_concurrent_requests_sync_once(self):
+        handler = BaseHandler()
+
+        def slow_time(method, path, params):
+            if path == "/time":
+                time.sleep(0.05)  # Abre a janela entre o is_alive() e o start() da thread
+            return handler(method, path, params)
+
+        mexc = make_mexc(slow_time)
+        threads = [threading.Thread(target=mexc.get_order, args=("AAA", f"id{index}")) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        mexc.stop_time_sync()
+        self.assertEqual(len([call for call in mexc.session.calls if call[1] == "/time"]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
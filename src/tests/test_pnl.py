@@ -0,0 +1,110 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.services.database import DatabaseManager
+from src.services.pnl import FifoPnlEngine
+
+
+def trade(trade_id, side, quantity, price, time, symbol='AAAUSDT'):
+    return {
+        'trade_id': trade_id, 'symbol': symbol, 'side': side,
+        'quantity': quantity, 'price': price, 'quoteQty': quantity * price, 'time': time
+    }
+
+
+class FifoPnlEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp_dir.name, "trades.db"))
+        self.engine = FifoPnlEngine(self.db)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp_dir.cleanup()
+
+    def realized(self):
+        return self.db.connect().execute('''
+            SELECT buy_trade_id, sell_trade_id, quantity, buy_price, sell_price, pnl
+            FROM pnl_realized ORDER BY close_time, open_time
+        ''').fetchall()
+
+    def open_lots(self):
+        return self.db.connect().execute(
+            "SELECT trade_id, quantity, price FROM pnl_open_lots ORDER BY id"
+        ).fetchall()
+
+    def test_partial_fills(self):
+        self.db.save_to_sqlite([
+            trade('b1', 'BUY', 10, 2.0, 1000),
+            trade('b2', 'BUY', 5, 4.0, 2000),
+            trade('s1', 'SELL', 12, 5.0, 3000),
+        ])
+        self.assertEqual(self.engine.process(), 3)
+
+        # SELL 12 @ 5: fecha o lote b1 inteiro (10 @ 2) e 2 de b2 (5 @ 4)
+        self.assertEqual(self.realized(), [
+            ('b1', 's1', 10, 2.0, 5.0, 30.0),
+            ('b2', 's1', 2, 4.0, 5.0, 2.0),
+        ])
+        self.assertEqual(self.open_lots(), [('b2', 3, 4.0)])
+        self.assertEqual(self.engine.realized_pnl(), [('AAAUSDT', 32.0, 12)])
+
+        # Segunda execução sem trades novas não faz nada; uma SELL nova continua do lote aberto
+        self.assertEqual(self.engine.process(), 0)
+        self.db.save_to_sqlite([trade('s2', 'SELL', 1, 10.0, 4000)])
+        self.assertEqual(self.engine.process(), 1)
+        self.assertEqual(self.realized()[-1], ('b2', 's2', 1, 4.0, 10.0, 6.0))
+        self.assertEqual(self.open_lots(), [('b2', 2, 4.0)])
+
+    def test_out_of_order_trade_replays_symbol(self):
+        self.db.save_to_sqlite([
+            trade('b1', 'BUY', 10, 2.0, 1000),
+            trade('b2', 'BUY', 5, 4.0, 2000),
+            trade('s1', 'SELL', 12, 5.0, 3000),
+        ])
+        self.engine.process()
+
+        # b0 chega depois (row id maior) mas foi executada antes de todas as outras
+        self.db.save_to_sqlite([
+            trade('b0', 'BUY', 4, 1.0, 500),
+            trade('s2', 'SELL', 3, 6.0, 4000),
+        ])
+        self.engine.process()
+
+        # FIFO em ordem de tempo: b0, b1, b2, s1, s2
+        # s1 (12 @ 5): 4 de b0 (+16) e 8 de b1 (+24); s2 (3 @ 6): 2 de b1 (+8) e 1 de b2 (+2)
+        self.assertEqual(self.realized(), [
+            ('b0', 's1', 4, 1.0, 5.0, 16.0),
+            ('b1', 's1', 8, 2.0, 5.0, 24.0),
+            ('b1', 's2', 2, 2.0, 6.0, 8.0),
+            ('b2', 's2', 1, 4.0, 6.0, 2.0),
+        ])
+        self.assertEqual(self.open_lots(), [('b2', 4, 4.0)])
+        self.assertEqual(self.engine.realized_pnl(), [('AAAUSDT', 50.0, 15)])
+        self.assertEqual(self.engine.open_positions(), [('AAAUSDT', 4, 16.0, 4.0)])
+
+    def test_symbols_are_independent(self):
+        self.db.save_to_sqlite([
+            trade('a1', 'BUY', 2, 10.0, 1000),
+            trade('x1', 'BUY', 1, 50.0, 1000, symbol='BBBUSDT'),
+            trade('a2', 'SELL', 1, 12.0, 2000),
+        ])
+        self.engine.process()
+        # Trade atrasada de BBB não reprocessa AAA
+        self.db.save_to_sqlite([trade('x0', 'BUY', 1, 40.0, 500, symbol='BBBUSDT')])
+        self.engine.process()
+
+        self.assertEqual(self.engine.realized_pnl(), [('AAAUSDT', 2.0, 1)])
+        self.assertEqual(
+            sorted(self.engine.open_positions()),
+            [('AAAUSDT', 1, 10.0, 10.0), ('BBBUSDT', 2, 90.0, 45.0)]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
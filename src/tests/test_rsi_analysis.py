@@ -0,0 +1,270 @@
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+import pandas as pd
+from src.strategies.kline_store import KLINE_DTYPE, KlineStore
+from src.strategies.indicator_panel import IndicatorPanel
+from src.strategies.rsi_analysis import SYMBOL_DATA_FIELDS, RSIAnalyzer, compact_features
+
+DAY_MS = 86400000
+SYMBOL = "AAAUSDT"
+
+
+def random_frame(store, days, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.002, 0.03, days)))
+    records = np.empty(days, dtype=KLINE_DTYPE)
+    records['timestamp'] = 1600000000000 + np.arange(days) * DAY_MS
+    records['open'] = np.concatenate([[100.0], close[:-1]])
+    records['high'] = np.maximum(records['open'], close) * 1.01
+    records['low'] = np.minimum(records['open'], close) * 0.99
+    records['close'] = close
+    records['volume'] = rng.lognormal(10, 0.5, days)
+    return store.to_dataframe(records)
+
+
+class FixedIndicators:
+    """Substitui o estado incremental: devolve sempre os mesmos valores float64."""
+
+    def __init__(self, values):
+        self.values = values
+
+    def run(self, symbols, max_high):
+        return dict(self.values)
+
+
+def legacy_symbol_data(values, days_since_ath):
+    """symbol_data de um símbolo como run_rsi_analysis e main() montavam antes da tabela de features."""
+    data = {}
+    for name in SYMBOL_DATA_FIELDS:
+        if name == "Days_Since_ATH":
+            data[name] = days_since_ath
+        else:
+            value = values[name][0]
+            data[name] = bool(value) if values[name].dtype == bool else float(value)
+    # Um símbolo só: rank 1 nos dois sentidos
+    data['RSI_Rank'] = 1.0
+    data['RSI_Rank_ASC'] = 1.0
+    return {SYMBOL: data}
+
+
+class RSIAnalyzerSetupsTest(unittest.TestCase):
+    """Os setups da tabela de features têm que ser os mesmos do caminho antigo com dicts."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        exclusion_file = os.path.join(self.tmp_dir.name, "exclusion_list.json")
+        with open(exclusion_file, "w") as file:
+            json.dump({"fut_binance_exclude": []}, file)
+        self.analyzer = RSIAnalyzer(exclusion_file)
+        self.frames = {SYMBOL: random_frame(self.analyzer.kline_store, 205, seed=3)}
+        self.ath_info = {SYMBOL: (float(self.frames[SYMBOL]['high'].max()), 2)}
+        self.values = IndicatorPanel(self.frames).last_closed(np.array([self.ath_info[SYMBOL][0]]))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def table_setups(self):
+        self.analyzer.features = self.analyzer.build_features(self.frames, self.ath_info)
+        return self.analyzer.processar_symbols()
+
+    def test_table_matches_legacy_dict(self):
+        expected = self.analyzer.processar_symbols(legacy_symbol_data(self.values, 2))
+        self.assertEqual(self.table_setups(), expected)
+        self.assertTrue(any(expected.values()))
+
+    def test_threshold_uses_float64_values(self):
+        # RSI um pouco acima de 65: float32 arredonda para 65.0 e D1_L1 (RSI > 65) deixaria de valer
+        self.values["RSI"] = np.array([65.000001])
+        self.values["SMA_RSI"] = np.array([65.0])
+        self.analyzer.indicator_state = FixedIndicators(self.values)
+
+        expected = self.analyzer.processar_symbols(legacy_symbol_data(self.values, 2))
+        self.assertEqual(expected['D1_L1'], [SYMBOL])
+        self.assertEqual(self.table_setups(), expected)
+
+        compact = compact_features(self.analyzer.features)
+        self.assertEqual(compact['RSI'].dtype, np.float32)
+        self.assertEqual(compact['SMA_50'].dtype, bool)
+        self.assertEqual(float(compact['RSI'].iloc[0]), 65.0)
+        self.assertEqual(self.analyzer.processar_symbols(compact)['D1_L1'], [])
+        self.assertEqual(self.analyzer.features['RSI'].iloc[0], 65.000001)
+
+
+class StubResponse:
+    def __init__(self, status_code, data=None, headers=None):
+        self.status_code = status_code
+        self.data = data
+        self.headers = headers or {}
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise AssertionError(f"HTTP {self.status_code}")
+
+
+class StubSession:
+    """Sessão falsa da Binance: `handler(path, params)` devolve um StubResponse."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, timeout=None):
+        path = url.replace(RSIAnalyzer.BASE_URL, "")
+        with self.lock:
+            self.calls.append((path, dict(params or {})))
+        return self.handler(path, params or {})
+
+
+class StubLimiter:
+    """Registra o peso pedido e as pausas sem dormir."""
+
+    def __init__(self):
+        self.acquired = []
+        self.pauses = []
+
+    def acquire(self, tokens=1):
+        self.acquired.append(tokens)
+
+    def pause(self, seconds):
+        self.pauses.append(seconds)
+
+
+def binance_klines(days, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, days)))
+    start = 1600000000000
+    return [
+        [start + index * DAY_MS, str(value), str(value * 1.01), str(value * 0.99), str(value), "1000",
+         start + (index + 1) * DAY_MS - 1, "0", 1, "0", "0", "0"]
+        for index, value in enumerate(close)
+    ]
+
+
+class BinanceDownloadTest(unittest.TestCase):
+    """Download concorrente da análise: limite de peso, 418/429 e ordem dos símbolos."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        exclusion_file = os.path.join(self.tmp_dir.name, "exclusion_list.json")
+        with open(exclusion_file, "w") as file:
+            json.dump({"fut_binance_exclude": []}, file)
+        self.analyzer = RSIAnalyzer(exclusion_file, max_workers=3, weight_per_minute=1200)
+        self.analyzer.kline_store = KlineStore(os.path.join(self.tmp_dir.name, "klines"))
+        self.analyzer.db_path = os.path.join(self.tmp_dir.name, "historical_high.db")
+        conn = sqlite3.connect(self.analyzer.db_path)
+        conn.execute("CREATE TABLE historical_high (symbol TEXT PRIMARY KEY, max_high REAL, ath_date TEXT, updated_at TEXT)")
+        conn.close()
+        self.limiter = StubLimiter()
+        self.analyzer.rate_limiter = self.limiter
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def use_responses(self, *responses):
+        responses = list(responses)
+        self.analyzer.session = StubSession(lambda path, params: responses.pop(0))
+
+    def test_used_weight_near_limit_pauses(self):
+        self.use_responses(
+            StubResponse(200, [], {"X-MBX-USED-WEIGHT-1M": "500"}),
+            StubResponse(200, [], {"X-MBX-USED-WEIGHT-1M": "1100"}),
+        )
+        self.analyzer._get("/klines", weight=2)
+        self.assertEqual(self.limiter.pauses, [])
+        self.analyzer._get("/klines", weight=2)
+        # 1100 > 90% de 1200: espera até a virada do minuto
+        self.assertEqual(len(self.limiter.pauses), 1)
+        self.assertTrue(0 < self.limiter.pauses[0] <= 60)
+        self.assertEqual(self.limiter.acquired, [2, 2])
+
+    def test_retry_after_and_backoff(self):
+        self.use_responses(
+            StubResponse(429, headers={"Retry-After": "7"}),
+            StubResponse(418),
+            StubResponse(429),
+            StubResponse(200, ["ok"]),
+        )
+        response = self.analyzer._get("/klines", weight=5)
+        self.assertEqual(response.json(), ["ok"])
+        # Retry-After quando presente; senão backoff exponencial 2**attempt * 5
+        self.assertEqual(self.limiter.pauses, [7.0, 10, 20])
+        self.assertEqual(self.limiter.acquired, [5, 5, 5, 5])
+
+    def test_gives_up_after_max_retries(self):
+        self.use_responses(*[StubResponse(429) for _ in range(3)])
+        response = self.analyzer._get("/klines", max_retries=2)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(len(self.analyzer.session.calls), 3)
+        self.assertEqual(self.limiter.pauses, [5, 10])
+
+    def test_results_follow_exchange_info_order(self):
+        symbols = ["CCCUSDT", "AAAUSDT", "BBBUSDT", "DDDUSDT"]
+        # Os primeiros da lista demoram mais: chegam na ordem inversa
+        delays = {"CCCUSDT": 0.3, "AAAUSDT": 0.2, "BBBUSDT": 0.1, "DDDUSDT": 0.0}
+
+        def handler(path, params):
+            if path == "/exchangeInfo":
+                return StubResponse(200, {"symbols": [
+                    {"symbol": symbol, "contractType": "PERPETUAL"} for symbol in symbols
+                ] + [{"symbol": "EEEUSDT", "contractType": "CURRENT_QUARTER"}]})
+            time.sleep(delays[params["symbol"]])
+            return StubResponse(200, binance_klines(30, seed=symbols.index(params["symbol"])))
+
+        self.analyzer.session = StubSession(handler)
+        arrived = [symbol for symbol, _ in self.analyzer.fetch_klines(symbols[:3])]
+        self.assertEqual(arrived, ["BBBUSDT", "AAAUSDT", "CCCUSDT"])
+
+        self.analyzer.kline_store = KlineStore(os.path.join(self.tmp_dir.name, "fresh"))
+        features = self.analyzer.run_rsi_analysis()
+        self.assertEqual(list(features.index), symbols)
+        self.assertEqual(list(self.analyzer.features.index), symbols)
+        # Primeira execução: 205 klines por símbolo, peso 2 (limit < 500)
+        klines_weights = self.limiter.acquired[-len(symbols):]
+        self.assertEqual(klines_weights, [2] * len(symbols))
+
+    def klines_handler(self, path, params):
+        return StubResponse(200, binance_klines(30, seed=0))
+
+    def test_corrupt_legacy_parquet_falls_back_to_full_download(self):
+        os.makedirs(self.analyzer.kline_store.data_dir)
+        with open(os.path.join(self.analyzer.kline_store.data_dir, "AAAUSDT.parquet"), "wb") as file:
+            file.write(b"not a parquet file")
+        self.analyzer.session = StubSession(self.klines_handler)
+
+        results = dict(self.analyzer.fetch_klines(["AAAUSDT"]))
+        self.assertEqual(len(results["AAAUSDT"]), 30)
+        # Sem cursor local: download completo (sem startTime)
+        self.assertNotIn("startTime", self.analyzer.session.calls[0][1])
+
+    def test_legacy_parquet_without_timestamp_is_skipped(self):
+        os.makedirs(self.analyzer.kline_store.data_dir)
+        for symbol in ("AAAUSDT", "BBBUSDT"):
+            open(os.path.join(self.analyzer.kline_store.data_dir, f"{symbol}.parquet"), "wb").close()
+        legacy = pd.DataFrame({"open": [1.0], "high": [1.0], "low": [1.0], "close": [1.0], "volume": [1.0]})
+        self.analyzer.session = StubSession(self.klines_handler)
+
+        with mock.patch("src.strategies.rsi_analysis.pd.read_parquet", return_value=legacy):
+            results = dict(self.analyzer.fetch_klines(["AAAUSDT", "BBBUSDT"]))
+        # Um arquivo ruim não interrompe a varredura: os dois símbolos chegam completos
+        self.assertEqual(sorted(results), ["AAAUSDT", "BBBUSDT"])
+        self.assertTrue(all(len(df) == 30 for df in results.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
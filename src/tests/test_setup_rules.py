@@ -0,0 +1,167 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+import pandas as pd
+from src.strategies.setup_rules import SetupRules
+
+BOOL_FIELDS = [
+    "SMA_7", "SMA_20", "SMA_50", "SMA_100", "SMA_200",
+    "SMA_S_7", "SMA_S_20", "SMA_S_50", "SMA_S_100", "SMA_S_200",
+    "DIR_MAS", "DIR_S_MAS",
+    "BB10_TOP", "BB10_INF", "BB10_BOT", "BB20_BSUP", "BB20_INF", "BB20_BOT", "BB50_SUP", "BB50_BOT",
+]
+
+
+def legacy_filter(symbol_data, top_n, condition):
+    """RSIAnalyzer.filter_symbols_based_on_conditions antes das regras declarativas."""
+    sorted_symbols = sorted(symbol_data.items(), key=lambda x: x[1]['RSI'], reverse=True)[:top_n]
+    return [symbol for symbol, data in sorted_symbols if condition(data)]
+
+
+def legacy_setups(symbol_data):
+    """Condições escritas à mão de RSIAnalyzer.processar_symbols, como eram antes do setup_rules.json."""
+    qty_items_all = len(symbol_data)
+    listas = {
+        'L_15_ST1': legacy_filter(symbol_data, 5, lambda data: float(data['Close']) < 0.09 and float(data['RSI']) < 80 and data['SMA_50'] == True),
+        'L_15_ST2': legacy_filter(symbol_data, 5, lambda data: float(data['Close']) < 0.09 and float(data['RSI']) < 80 and float(data['SMA_RSI']) < 70 and data['SMA_50'] == True and data['SMA_200'] == True),
+        'L_5_ST1': legacy_filter(symbol_data, 5, lambda data: data['Close'] > -0.08 and data['Close'] < 0.06 and data['RSI'] < 65 and data['SMA_50'] == True),
+        'L_5_ST2': legacy_filter(symbol_data, 10, lambda data: data['Close'] > -0.08 and data['Close'] < 0.06 and data['RSI'] > 65 and data['SMA_50'] == True and data['SMA_100'] == True and data['SMA_200'] == True and data['DIR_MAS'] == True),
+        'S_15': legacy_filter(symbol_data, 30, lambda data: data['Close'] < -0.03 and data['RSI'] > 25 and data['RSI'] < 40 and data['SMA_S_50'] == True and data['SMA_S_100'] == True and data['DIR_S_MAS'] == True),
+        'S_5': legacy_filter(symbol_data, 20, lambda data: data['RSI'] > 25 and data['RSI'] < 40 and data['SMA_S_50'] == True and data['SMA_S_100'] == True),
+        'D1_W': legacy_filter(symbol_data, 20, lambda data: data['RSI'] > 80 and float(data['SMA_RSI']) < 75 and (data['RSI'] - float(data['SMA_RSI'])) > 15 and data['SMA_S_50'] == True and data['Close'] > 0.03 and data['Close'] < 0.6),
+        'D1_D': legacy_filter(symbol_data, 10, lambda data: data['RSI'] > 80 and float(data['SMA_RSI']) < 75 and (data['RSI'] - float(data['SMA_RSI'])) > 0 and (data['RSI'] - float(data['SMA_RSI'])) < 20 and data['SMA_S_50'] == True and data['Close'] > 0.03 and data['Close'] < 0.6),
+    }
+    for name in ['D1_L1', 'D1_L2', 'D1_L4', 'D1_L5', 'D1_N1', 'D1_N2_BB1', 'D1_N2_BB2', 'D1_N2_BB3', 'D1_N3', 'D1_B1', 'D1_B2', 'D1_B3']:
+        listas[name] = []
+
+    for symbol, data in sorted(symbol_data.items(), key=lambda x: x[1]['RSI'], reverse=True):
+        rsi_quartil = data['RSI_Rank'] / qty_items_all
+        rsi_quartil_asc = data['RSI_Rank_ASC'] / qty_items_all
+        sma_rsi = float(data['SMA_RSI'])
+        checks = {
+            'D1_L1': data['RSI'] > 65 and data['RSI'] < 95 and sma_rsi < 70 and sma_rsi > 60,
+            'D1_L2': data['RSI'] > 65 and data['RSI'] < 75 and 0.06 < rsi_quartil < 0.45,
+            'D1_L4': data['RSI'] > 65 and data['RSI'] < 95 and ((sma_rsi > 75 and sma_rsi < 80) or sma_rsi < 60) and data['Diff_ATH%'] > -0.25,
+            'D1_L5': data['RSI'] > 70 and data['RSI'] < 90 and data['Days_Since_ATH'] < 5,
+            'D1_N1': 55 < data['RSI'] < 65 and all([data['SMA_7'], data['SMA_20'], data['SMA_50'], data['SMA_100']]) and not data['SMA_200'],
+            'D1_N2_BB1': data['RSI'] > 55 and data['RSI'] < 65 and all([data['BB10_INF'], data['BB20_BSUP'], data['BB50_SUP']]),
+            'D1_N2_BB2': data['RSI'] > 57 and data['RSI'] < 65 and all([data['BB10_TOP'], data['BB20_BSUP'], data['BB50_SUP']]),
+            'D1_N2_BB3': data['RSI'] > 30 and data['RSI'] < 65 and all([data['BB10_INF'], data['BB20_INF'], data['BB50_SUP']]),
+            'D1_N3': data['RSI'] > 60 and data['RSI'] < 65 and data['Diff_ATH%'] > -0.08,
+            'D1_B1': data['RSI'] < 28 and sma_rsi > 30,
+            'D1_B2': data['RSI'] < 28 and all([data['BB10_BOT'], data['BB20_BOT'], data['BB50_BOT']]),
+            'D1_B3': data['RSI'] < 28 and rsi_quartil_asc > 0.12,
+        }
+        for name, passed in checks.items():
+            if passed:
+                listas[name].append(symbol)
+    return listas
+
+
+RSI_THRESHOLDS = [25, 28, 30, 40, 55, 57, 60, 65, 70, 75, 80, 90, 95]
+# Faixas de RSI por fixture: os setups com "top" só aparecem quando os maiores RSIs caem na faixa deles
+RSI_RANGES = [(10, 98), (20, 39), (45, 64), (50, 79), (60, 90), (70, 86)]
+FIXTURES = [(low, high, seed) for low, high in RSI_RANGES for seed in range(4)]
+
+
+def fixture_symbol_data(low, high, seed, size=400):
+    """
+    symbol_data sintético cobrindo as faixas dos setups: RSIs contínuos e exatamente nos
+    limites das regras (com empates), Close e Diff_ATH% em volta dos cortes.
+    """
+    rng = np.random.default_rng(seed)
+    thresholds = [value for value in RSI_THRESHOLDS if low <= value <= high]
+    symbol_data = {}
+    for index in range(size):
+        rsi = float(rng.choice(thresholds)) if rng.random() < 0.2 else round(float(rng.uniform(low, high)), 2)
+        sma_rsi = rng.choice([rsi - rng.uniform(-5, 25), rng.uniform(20, 90), rng.choice([30, 60, 70, 75, 80]), np.inf], p=[0.5, 0.3, 0.15, 0.05])
+        data = {
+            'RSI': rsi,
+            'SMA_RSI': float(sma_rsi),
+            'Close': float(rng.choice([rng.uniform(-0.12, 0.12), 0.09, -0.08, 0.06, 0.03, -0.03, 0.7])),
+            'Diff_ATH%': float(rng.choice([rng.uniform(-0.5, 0.0), -0.25, -0.08])),
+            'Days_Since_ATH': int(rng.integers(0, 10)),
+        }
+        for field in BOOL_FIELDS:
+            data[field] = bool(rng.random() < 0.6)
+        symbol_data[f"S{index:03d}USDT"] = data
+
+    ranks = pd.Series({symbol: data['RSI'] for symbol, data in symbol_data.items()})
+    for symbol, rank in ranks.rank(ascending=False, method='dense').items():
+        symbol_data[symbol]['RSI_Rank'] = float(rank)
+    for symbol, rank in ranks.rank(ascending=True, method='dense').items():
+        symbol_data[symbol]['RSI_Rank_ASC'] = float(rank)
+    return symbol_data
+
+
+class SetupRulesTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.rules = SetupRules()
+
+    def test_masks_match_legacy_conditions(self):
+        for low, high, seed in FIXTURES:
+            symbol_data = fixture_symbol_data(low, high, seed)
+            expected = legacy_setups(symbol_data)
+            result = self.rules.evaluate(pd.DataFrame.from_dict(symbol_data, orient='index'))
+            self.assertEqual(list(result), list(self.rules.rules))
+            for name in expected:
+                with self.subTest(fixture=seed, setup=name):
+                    self.assertEqual(result[name], expected[name])
+
+    def test_fixture_reaches_every_setup(self):
+        """Garante que a comparação acima não passa só com listas vazias."""
+        merged = {name: set() for name in self.rules.rules}
+        for low, high, seed in FIXTURES:
+            for name, symbols in legacy_setups(fixture_symbol_data(low, high, seed)).items():
+                merged[name].update(symbols)
+        self.assertEqual([name for name, symbols in merged.items() if not symbols], [])
+
+    def test_ties_keep_input_order(self):
+        symbol_data = fixture_symbol_data(10, 95, seed=1, size=12)
+        for data in symbol_data.values():
+            data.update(RSI=70.0, SMA_RSI=65.0, RSI_Rank=1.0, RSI_Rank_ASC=1.0)
+        expected = legacy_setups(symbol_data)
+        result = self.rules.evaluate(pd.DataFrame.from_dict(symbol_data, orient='index'))
+        self.assertEqual(result['D1_L1'], list(symbol_data))
+        self.assertEqual(result, expected)
+
+    def test_custom_rules_file(self):
+        rules = {
+            "TOP2_BULL": {"top": 2, "all": [["SMA_50", "==", True]]},
+            "EXTREMES": {"any": [[["RSI", ">=", 80]], [["RSI", "<=", 20]]]},
+        }
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as file:
+            json.dump(rules, file)
+        try:
+            setup_rules = SetupRules(file.name)
+        finally:
+            os.remove(file.name)
+
+        features = pd.DataFrame({
+            'RSI': [85.0, 50.0, 90.0, 10.0],
+            'SMA_RSI': [50.0] * 4,
+            'SMA_50': [True, True, False, True],
+        }, index=['A', 'B', 'C', 'D'])
+        # Ordem por RSI: C, A, B, D; o "top" vale antes das condições
+        self.assertEqual(setup_rules.evaluate(features), {"TOP2_BULL": ['A'], "EXTREMES": ['C', 'A', 'D']})
+
+    def test_invalid_operator(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as file:
+            json.dump({"BAD": {"all": [["RSI", "=>", 10]]}}, file)
+        try:
+            with self.assertRaises(ValueError):
+                SetupRules(file.name)
+        finally:
+            os.remove(file.name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Adiciona o diretório raiz ao PYTHONPATH
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.services.api_mexc import MexcAPI
+from src.services.database import DatabaseManager
+from src.services.trade_sync import TradeSync
+from test_order_pipeline import StubResponse, make_mexc
+
+
+class TradesHandler:
+    """/myTrades falso: startTime inclusivo, e sem startTime só as `limit` trades mais recentes."""
+
+    def __init__(self, times, symbol="AAAUSDT"):
+        self.trades = [
+            {"id": index + 1, "symbol": symbol, "isBuyer": index % 2 == 0, "qty": "1", "price": "2",
+             "quoteQty": "2", "time": trade_time}
+            for index, trade_time in enumerate(times)
+        ]
+
+    def __call__(self, method, path, params):
+        if path == "/time":
+            return StubResponse(200, {"serverTime": 0})
+        if path == "/myTrades":
+            limit = int(params["limit"])
+            if "startTime" not in params:
+                return StubResponse(200, self.trades[-limit:])
+            start_time = int(params["startTime"])
+            return StubResponse(200, [trade for trade in self.trades if trade["time"] >= start_time][:limit])
+        raise AssertionError(f"Unexpected call {method} {path}")
+
+
+def my_trades_calls(mexc):
+    return [params for method, path, params in mexc.session.calls if path == "/myTrades"]
+
+
+class FetchTradesSinceTest(unittest.TestCase):
+    def test_first_sync_pages_from_epoch(self):
+        times = [1600000000000 + index * 1000 for index in range(2500)]
+        mexc = make_mexc(TradesHandler(times))
+        trades = mexc.fetch_trades_since("AAAUSDT")
+
+        self.assertEqual([trade['time'] for trade in trades], times)
+        calls = my_trades_calls(mexc)
+        self.assertEqual(calls[0]["startTime"], str(MexcAPI.TRADES_EPOCH))
+        self.assertTrue(all(call["limit"] == "1000" for call in calls))
+
+    def test_full_page_in_one_ms_moves_on(self):
+        # 1200 trades no mesmo ms e mais 10 depois: a página cheia não pode parar a paginação
+        times = [1600000000000] * 1200 + [1600000000001 + index for index in range(10)]
+        mexc = make_mexc(TradesHandler(times))
+        trades = mexc.fetch_trades_since("AAAUSDT", start_time=1600000000000)
+
+        # Só as trades além do limit naquele ms ficam de fora (a API não tem como buscá-las por tempo)
+        self.assertEqual(len(trades), 1010)
+        self.assertEqual(trades[-1]['time'], 1600000000010)
+
+    def test_resume_from_cursor(self):
+        times = [1000 * index for index in range(1, 31)]
+        mexc = make_mexc(TradesHandler(times))
+        trades = mexc.fetch_trades_since("AAAUSDT", start_time=20000, limit=10)
+        self.assertEqual([trade['time'] for trade in trades], times[19:])
+
+
+class TradeSyncTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp_dir.name, "trades.db"))
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp_dir.cleanup()
+
+    def test_first_sync_keeps_whole_history(self):
+        handler = TradesHandler([1600000000000 + index for index in range(1500)])
+        mexc = make_mexc(handler)
+        self.assertEqual(TradeSync(mexc, self.db).sync(["AAAUSDT"]), {"AAAUSDT": 1500})
+        self.assertEqual(self.db.get_sync_cursors(), {"AAAUSDT": (1600000001499, "1500")})
+
+        # Próxima execução: só as trades novas a partir do cursor
+        handler.trades.append(dict(handler.trades[-1], id=1501, time=1600000002000))
+        TradeSync(mexc, self.db).sync()
+        count = self.db.connect().execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+        self.assertEqual(count, 1501)
+
+
+if __name__ == "__main__":
+    unittest.main()